@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import threading
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.serialization import JSONResponse
+from app.db.export import EXPORT_BATCH_SIZE, iter_export
+from app.middleware import *
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/v1/admin",
+    tags=["admin"]
+)
+
+# Chunks buffered between the database thread and the response
+_STREAM_QUEUE_SIZE = 4
+_DONE = object()
+
+
+def is_admin(user_id) -> bool:
+    return user_id is not None and int(user_id) in settings.ADMIN_USER_IDS
+
+
+async def _stream_in_thread(make_iterator: Callable[[], Iterator[bytes]]) -> AsyncIterator[bytes]:
+    """
+    Drive a blocking iterator from one dedicated thread. Database cursors and
+    connections must stay on the thread that opened them, which the default
+    threadpool iteration of StreamingResponse doesn't guarantee.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=_STREAM_QUEUE_SIZE)
+    stopped = threading.Event()
+
+    def put(item):
+        # Blocks while the client is slower than the database
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce():
+        try:
+            for chunk in make_iterator():
+                if stopped.is_set():
+                    break
+                put(chunk)
+        except Exception as e:
+            logger.error(f"Export stream failed: {e}", exc_info=True)
+            put(e)
+        else:
+            put(_DONE)
+
+    thread = threading.Thread(target=produce, name="export-stream", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Client went away or we are done: unblock the producer so it closes its cursor
+        stopped.set()
+        while not queue.empty():
+            queue.get_nowait()
+
+
+@router.get("/export")
+async def export_cards(after_id: Optional[int] = None, batch_size: int = EXPORT_BATCH_SIZE,
+                       context: AuthContext = Depends(get_auth_context)):
+    """Stream every card as NDJSON, ordered by user id; resume with ``after_id``."""
+    user_id, error = check_context(context)
+    if not user_id or error:
+        return error
+
+    if not is_admin(user_id):
+        return JSONResponse(status_code=403, content={"error": "Admin access required"})
+
+    if batch_size < 1 or batch_size > 10000:
+        return JSONResponse(status_code=400, content={"error": "batch_size must be between 1 and 10000"})
+
+    logger.info(f"Admin {user_id} started a card export after id {after_id}")
+    return StreamingResponse(
+        _stream_in_thread(lambda: iter_export(after_id, batch_size)),
+        media_type="application/x-ndjson",
+    )
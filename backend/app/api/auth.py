@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Request, Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import JSONResponse
+from app.core.serialization import JSONResponse, read_json
 from jose import jwt, JWTError
+from typing import Dict, Optional
 import logging
 
-from app.db import get_user, create_user, set_user
-from app.core.telegram_auth import validate_telegram_data, extract_user_info
+from app.db import get_user, sign_in_user, get_entitlements
+from app.core.telegram_auth import verify_init_data
 from app.core.config import settings
+from app.middleware import AuthContext, get_auth_context, check_context
+from app.middleware.auth_cache import cached_login, remember_login
 
 logger = logging.getLogger(__name__)
 
@@ -17,11 +20,26 @@ router = APIRouter(
 
 security = HTTPBearer()
 
-def create_access_token(identity: str):
+def entitlement_claims(entitlements: Dict) -> Dict:
+    """
+    Tier claims for a token: the tier, when it expires and the entitlement
+    version they were read at, which the auth middleware checks before trusting them.
+    """
+    expires_at = entitlements.get("premium_expires_at")
+    return {
+        "tier": entitlements.get("premium_tier") or 0,
+        # premium_expires_at is naive local time, so timestamp() gives the right instant
+        "tier_exp": int(expires_at.timestamp()) if expires_at else None,
+        "ev": entitlements.get("entitlement_version") or 0,
+    }
+
+def create_access_token(identity: str, entitlements: Optional[Dict] = None):
     from datetime import timedelta, datetime
     expires_delta = timedelta(days=settings.ACCESS_TOKEN_EXPIRE_DAYS)
     expire = datetime.utcnow() + expires_delta
     to_encode = {"sub": identity, "exp": expire}
+    if entitlements is not None:
+        to_encode.update(entitlement_claims(entitlements))
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -46,7 +64,7 @@ async def initialize_from_telegram(request: Request):
             user_info = telegram_user
             logger.info(f"Using telegram_user from middleware: {telegram_id}")
         else:
-            data = await request.json()
+            data = await read_json(request)
             init_data = data.get('initData') if data else None
             
             if not init_data:
@@ -55,7 +73,7 @@ async def initialize_from_telegram(request: Request):
                     content={"success": False, "error": "No initData provided"}
                 )
                 
-            is_valid, data_dict, error_message = validate_telegram_data(init_data)
+            is_valid, data_dict, error_message, user_info = verify_init_data(init_data)
             
             if not is_valid:
                 return JSONResponse(
@@ -63,7 +81,6 @@ async def initialize_from_telegram(request: Request):
                     content={"success": False, "error": f"Invalid initData: {error_message}"}
                 )
                 
-            user_info = extract_user_info(data_dict)
             telegram_id = user_info.get('telegram_id')
             
             if not telegram_id:
@@ -72,18 +89,14 @@ async def initialize_from_telegram(request: Request):
                     content={"success": False, "error": "Could not extract Telegram user ID"}
                 )
         
-        is_new_user = False
         user_id = str(telegram_id)
-        user_data = get_user(user_id)
-        
-        if not user_data:
-            is_new_user = True
-            logger.info(f"Creating new user with id: {user_id}")
+        is_new_user = False
+        # Returning users are answered from the login cache without a query
+        user_data = cached_login(user_id)
 
-            logger.info(f"Creating user with user info: {user_info}")
-            
-            success = create_user(
-                user_id=user_id,
+        if user_data is None:
+            user_data, is_new_user = sign_in_user(
+                user_id,
                 username=user_info.get('username', ''),
                 name=user_info.get('first_name', '') + (f" {user_info.get('last_name', '')}" if user_info.get('last_name') else ''),
                 avatar_url=user_info.get('photo_url', ''),
@@ -92,23 +105,12 @@ async def initialize_from_telegram(request: Request):
                 description="",
                 badge="New User"
             )
-            
-            if not success:
-                return JSONResponse(
-                    status_code=500,
-                    content={"success": False, "error": "Failed to create user"}
-                )
-                
-            user_data = get_user(user_id)
-            if not user_data:
-                return JSONResponse(
-                    status_code=500,
-                    content={"success": False, "error": "User created but could not be retrieved"}
-                )
-                
-            logger.info(f"New user created with ID: {user_id}")
+            remember_login(user_id, user_data)
+
+            if is_new_user:
+                logger.info(f"New user created with ID: {user_id}")
         
-        token = create_access_token(identity=str(user_id))
+        token = create_access_token(identity=str(user_id), entitlements=user_data)
         
         return JSONResponse(
             status_code=200,
@@ -137,12 +139,30 @@ async def initialize_from_telegram(request: Request):
         )
 
 
+@router.post("/refresh")
+async def refresh_token(context: AuthContext = Depends(get_auth_context)):
+    """A new token with the caller's current tier claims, e.g. after a premium purchase."""
+    user_id, error = check_context(context)
+    if not user_id or error:
+        return error
+
+    entitlements = get_entitlements(user_id)
+    if not entitlements:
+        return JSONResponse(status_code=404, content={"success": False, "error": "User not found"})
+
+    return JSONResponse(status_code=200, content={
+        "success": True,
+        "token": create_access_token(identity=str(user_id), entitlements=entitlements),
+        "premium_tier": entitlements["premium_tier"] or 0,
+    })
+
+
 @router.post("/validate")
 async def validate_token(request: Request):
     logger.info("Auth validate endpoint called")
     
     try:
-        data = await request.json()
+        data = await read_json(request)
         token = data.get('token') if data else None
         
         if not token:
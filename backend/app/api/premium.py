@@ -1,16 +1,16 @@
 from typing import List
 from fastapi import APIRouter, Depends, Request
-from fastapi.responses import JSONResponse
+from app.core.serialization import JSONResponse, read_json
 from datetime import datetime, timedelta
 import logging
 from app.constants import PREMIUM_TIERS
 import telebot
 from app.core.config import settings
 from telebot.types import LabeledPrice
+from app.core.entitlements import features_for_tier, tier_name, tier_price
 from app.db import (
     get_user, 
-    set_user,
-    get_premium_features_by_tier
+    set_user
 )
 from app.middleware import *
 
@@ -25,21 +25,9 @@ router = APIRouter(
 
 APPROVED_PAYMENTS = []
 
-def find_tier_price(tier_number):
-    for tier_item in PREMIUM_TIERS:
-        if tier_item["tier"] == tier_number:
-            return tier_item["price"]
-    return None
-
-def get_tier_name(tier_level):
-    tier_names = {0: "Free", 1: "Basic", 2: "Premium", 3: "Ultimate"}
-    return tier_names.get(tier_level, "Unknown")
-
-
 @router.get("/premium/features")
 async def get_premium_features():
-    features = get_premium_features_by_tier(3)
-    return JSONResponse(status_code=200, content=features)
+    return JSONResponse(status_code=200, content=features_for_tier(3))
 
 
 @router.get("/premium/tiers")
@@ -49,7 +37,7 @@ async def get_premium_tiers():
 
 @router.post("/premium/successful_payment")
 async def successful_payment(request: Request):
-    data = await request.json()
+    data = await read_json(request)
     if not data or "user_id" not in data or "tier" not in data or "security_code" not in data:
         return JSONResponse(status_code=400, content={"error": "Missing required fields"})
 
@@ -70,7 +58,7 @@ async def successful_payment(request: Request):
 
 @router.post("/premium/check_payment")
 async def check_payment(request: Request):
-    data = await request.json()
+    data = await read_json(request)
     if not data or "user_id" not in data or "tier" not in data:
         return JSONResponse(status_code=400, content={"error": "Missing required fields"})
     
@@ -88,7 +76,7 @@ async def check_payment(request: Request):
             "message": "Payment approved",
             "premium_status": {
                 "premium_tier": tier,
-                "tier_name": get_tier_name(tier),
+                "tier_name": tier_name(tier),
                 "expires_at": str((datetime.now() + timedelta(days=30)).isoformat()),
                 "is_active": True
             }
@@ -101,7 +89,7 @@ async def check_payment(request: Request):
             "message": "User already has this premium tier",
             "premium_status": {
                 "premium_tier": user_data.get("premium_tier", 0),
-                "tier_name": get_tier_name(user_data.get("premium_tier", 0)),
+                "tier_name": tier_name(user_data.get("premium_tier", 0)),
                 "expires_at": str(user_data.get("premium_expires_at", None)),
                 "is_active": True
             }
@@ -117,7 +105,7 @@ async def generate_payment_link(request: Request, context: AuthContext = Depends
     if not user_id or error:
         return error
     
-    data = await request.json()
+    data = await read_json(request)
     if not data or "tier" not in data:
         return JSONResponse(status_code=400, content={"error": "Missing required fields"})
     
@@ -131,7 +119,7 @@ async def generate_payment_link(request: Request, context: AuthContext = Depends
         currency="XTR",
         payload=f"premium_{user_id}_{tier}",
         provider_token=None,
-        prices=[LabeledPrice(label="Label", amount=find_tier_price(tier))]
+        prices=[LabeledPrice(label="Label", amount=tier_price(tier))]
     )
     
     return JSONResponse(status_code=200, content={"success": True, "payment_url": payment_link})
@@ -147,13 +135,12 @@ async def get_premium_status(context: AuthContext = Depends(get_auth_context)):
     if not user_data:
         return JSONResponse(status_code=404, content={"error": "User not found"})
     
-    tier_names = {0: "Free", 1: "Basic", 2: "Premium", 3: "Ultimate"}
     premium_tier = user_data.get("premium_tier", 0)
     premium_expires_at = user_data.get("premium_expires_at")
     
     return JSONResponse(status_code=200, content={
         "premium_tier": premium_tier,
-        "tier_name": tier_names.get(premium_tier, "Unknown"),
+        "tier_name": tier_name(premium_tier),
         "expires_at": premium_expires_at.isoformat() if premium_expires_at else None,
         "is_active": premium_tier > 0 and (premium_expires_at is None or premium_expires_at > datetime.now())
     })
\ No newline at end of file
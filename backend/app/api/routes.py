@@ -10,15 +10,18 @@ def register_routes(app: FastAPI) -> FastAPI:
     from app.api.users import router as users_router
     from app.api.premium import router as premium_router
     from app.api.file_routes import router as files_router
+    from app.api.admin import router as admin_router
     
     app.include_router(auth_router)
     app.include_router(users_router)
     app.include_router(premium_router)
     app.include_router(files_router)
+    app.include_router(admin_router)
     
     logger.info(f"Registered auth router: {auth_router.prefix}")
     logger.info(f"Registered users router: {users_router.prefix}")
     logger.info(f"Registered premium router: {premium_router.prefix}")
     logger.info(f"Registered files router: {files_router.prefix}")
+    logger.info(f"Registered admin router: {admin_router.prefix}")
     
     return app
\ No newline at end of file
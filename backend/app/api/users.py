@@ -2,7 +2,9 @@ from typing import List, Optional
 import logging
 from datetime import datetime, timedelta
 from app.core.search import get_skill_search
-from app.core.validations import validate_string, validate_user_data, validate_contact, validate_project, validate_skills_limit, validate_links_limit, validate_projects_limit, validate_user_premium_data
+from app.core.entitlements import quota
+from app.core.images import ImageJobTimeout, ImageQueueFull, compress
+from app.core.validations import validate_string, validate_user_data, validate_contact, validate_project, validate_skills_limit, validate_links_limit, validate_contacts_limit, validate_projects_limit, validate_user_premium_data
 from app.db.models import User, Contact, Project, Skill, CustomLink, user_skill
 from app.schemas import UserResponse
 import sys
@@ -16,13 +18,31 @@ stories_path = os.path.join(os.path.dirname(__file__), '..', '..', "..", 'files'
 
 from app.core.search import get_skill_search
 from app.middleware import *
-from fastapi import Depends, APIRouter, Request, File, UploadFile, Form
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
+from fastapi import Depends, APIRouter, Request, Response, File, UploadFile, Form
+from app.core.serialization import JSONDecodeError, JSONResponse, read_json
+from app.core.config import settings
 from app.db import *
-
-from PIL import Image
-import io
+from app.db.session import mark_user_written
+from app.db.reads import (
+    get_profile,
+    get_profile_changes,
+    get_profile_version,
+    get_profiles,
+    get_relation_count,
+    parse_fieldset,
+    search_user_cards,
+    serialize,
+    serialize_changes,
+)
+from app.core.http_cache import (
+    OWN_CARD_CACHE_CONTROL,
+    PUBLIC_CARD_CACHE_CONTROL,
+    cache_headers,
+    etag_matches,
+    not_modified,
+    profile_etag,
+    representation,
+)
 
 
 router = APIRouter(
@@ -32,19 +52,29 @@ router = APIRouter(
 
 logger = logging.getLogger(__name__)
 
+# Most cards one POST /users/batch may ask for
+BATCH_MAX_IDS = getattr(settings, "BATCH_MAX_IDS", 50)
+
+
+def _image_queue_full():
+    return JSONResponse(status_code=503, content={"error": "Too many images being processed, try again shortly"},
+                        headers={"Retry-After": "1"})
+
+
+def _image_timed_out():
+    return JSONResponse(status_code=504, content={"error": "Image took too long to process"})
+
 
-def compress_image(image_bytes, max_size=(512, 512), quality=75):
-    image = Image.open(io.BytesIO(image_bytes))
-    image = image.convert("RGB")
-    image.thumbnail(max_size, Image.LANCZOS)
-    output = io.BytesIO()
-    image.save(output, format="JPEG", quality=quality, optimize=True)
-    return output.getvalue()
+def _check_quota(user_id, tier: int, resource: str, validate):
+    # Tiers without a quota for the resource don't need the count query
+    if quota(tier, resource) is None:
+        return True, None
+    return validate(get_relation_count(resource, user_id), tier)
 
 
 @router.post("/users")
 async def user_endpoint(request: Request, user: UserResponse):
-    data = await request.json()
+    data = await read_json(request)
 
     if not data or not data.get("id"):
         return JSONResponse(status_code=400, content={"error": "Missing required fields"})
@@ -78,7 +108,7 @@ async def check_new_endpount(user_id: int):
 
 @router.post("/users/new/update")
 async def update_new_endpoint(request: Request):
-    data = await request.json()
+    data = await read_json(request)
     if not data or "user_id" not in data:
         return JSONResponse(status_code=400, content={"error": "Missing required fields"})
     
@@ -92,31 +122,45 @@ async def update_new_endpoint(request: Request):
 
 
 @router.get("/users/me")
-async def get_current_user(context: AuthContext = Depends(get_auth_context)):
+async def get_current_user(request: Request, fields: str = None, include: str = None, since: int = None,
+                           context: AuthContext = Depends(get_auth_context)):
     user_id, error = check_context(context)
     if not user_id or error:
         return error
+
+    # Delta sync: only the sections changed after the client's version
+    if since is not None:
+        changes = get_profile_changes(user_id, since)
+        if changes is None:
+            return JSONResponse(status_code=404, content={"error": "User not found"})
+        headers = {"X-Profile-Version": str(changes.version), "Cache-Control": OWN_CARD_CACHE_CONTROL}
+        if changes.version == since:
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(status_code=200, content=serialize_changes(changes), headers=headers)
+
+    try:
+        fieldset = parse_fieldset(fields, include, public=False)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    variant = representation("me", fieldset.key if fieldset else None)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        version = get_profile_version(user_id)
+        if version is None:
+            return JSONResponse(status_code=404, content={"error": "User not found"})
+        etag = profile_etag(user_id, version, variant)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, OWN_CARD_CACHE_CONTROL)
     
-    user_data = get_user(user_id)
-    if not user_data:
+    profile = get_profile(user_id, fieldset=fieldset)
+    if not profile:
         return JSONResponse(status_code=404, content={"error": "User not found"})
-    
-    user_contacts = get_contacts(user_id)
-    user_projects = get_projects(user_id)
-    user_skills = get_skills(user_id)
-    user_links = get_custom_links(user_id)
-
-    full_user_data = {
-        **user_data,
-        "contacts": user_contacts,
-        "projects": user_projects,
-        "skills": user_skills,
-        "custom_links": user_links
-    }
-
-    json_compatible_data = jsonable_encoder(full_user_data)
 
-    return JSONResponse(status_code=200, content=json_compatible_data)
+    etag = profile_etag(user_id, profile.version, variant)
+    headers = cache_headers(etag, OWN_CARD_CACHE_CONTROL)
+    headers["X-Profile-Version"] = str(profile.version)
+    return JSONResponse(status_code=200, content=serialize(profile), headers=headers)
 
 
 @router.patch("/users/me")
@@ -125,7 +169,7 @@ async def update_user(request: Request, context: AuthContext = Depends(get_auth_
     if not user_id or error:
         return error
     
-    data = await request.json()
+    data = await read_json(request)
     if not data:
         return JSONResponse(status_code=400, content={"error": "No data provided"})
     
@@ -152,51 +196,90 @@ async def update_user(request: Request, context: AuthContext = Depends(get_auth_
     
     set_user(user_data)
 
-    json_compatible_data = jsonable_encoder(user_data)
-    
-    return JSONResponse(status_code=200, content=json_compatible_data)
+    return JSONResponse(status_code=200, content=user_data)
     
 
 @router.get("/users/{user_id}")
-async def get_user_endpoint(user_id: int, context: AuthContext = Depends(get_auth_context)):
+async def get_user_endpoint(user_id: int, request: Request, fields: str = None, include: str = None,
+                            context: AuthContext = Depends(get_auth_context)):
     auth_uid, error = check_context(context)
     if not auth_uid or error:
         return error
 
-    user_data = get_user(user_id)
-
     if len(str(user_id)) > 32 or len(str(user_id)) < 5:
         return JSONResponse(status_code=400, content={"error": "Invalid user ID"})
 
-    if not user_data:
+    try:
+        fieldset = parse_fieldset(fields, include, public=True)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    variant = representation("public", fieldset.key if fieldset else None)
+
+    # Revalidation only needs the version, not the card
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        version = get_profile_version(user_id)
+        if version is None:
+            return JSONResponse(status_code=404, content={"error": "User not found"})
+        etag = profile_etag(user_id, version, variant)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, PUBLIC_CARD_CACHE_CONTROL)
+
+    profile = get_profile(user_id, public=True, fieldset=fieldset)
+    if not profile:
         return JSONResponse(status_code=404, content={"error": "User not found"})
-    
-    user_contacts = get_contacts(user_id)
-    public_contacts = [contact for contact in user_contacts if contact.get("is_public", True)]
-    user_projects = get_projects(user_id)
-    user_skills = get_skills(user_id)
-    user_links = get_custom_links(user_id)
-
-    public_fields = ["id", "username", "name", "avatar_url", "background_type", 
-                    "background_value", "description", "badge"]
-    public_user_data = {field: user_data.get(field) for field in public_fields}
-    
-    public_user_data.update({
-        "contacts": public_contacts,
-        "projects": user_projects,
-        "skills": user_skills,
-        "custom_links": user_links
+
+    etag = profile_etag(user_id, profile.version, variant)
+    return JSONResponse(status_code=200, content=serialize(profile),
+                        headers=cache_headers(etag, PUBLIC_CARD_CACHE_CONTROL))
+
+
+@router.post("/users/batch")
+async def get_users_batch(request: Request, fields: str = None, include: str = None,
+                          context: AuthContext = Depends(get_auth_context)):
+    """Public cards for up to BATCH_MAX_IDS ids, keyed by id; unknown ids are listed in ``missing``."""
+    auth_uid, error = check_context(context)
+    if not auth_uid or error:
+        return error
+
+    try:
+        data = await read_json(request)
+    except JSONDecodeError:
+        return JSONResponse(status_code=400, content={"error": "Invalid JSON"})
+    ids = data.get("ids") if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not ids:
+        return JSONResponse(status_code=400, content={"error": "ids must be a non-empty list"})
+    if len(ids) > BATCH_MAX_IDS:
+        return JSONResponse(status_code=400, content={"error": f"At most {BATCH_MAX_IDS} ids per request"})
+    try:
+        ids = [int(user_id) for user_id in ids]
+    except (TypeError, ValueError):
+        return JSONResponse(status_code=400, content={"error": "Invalid user ID"})
+
+    try:
+        fieldset = parse_fieldset(fields, include, public=True)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    profiles = get_profiles(ids, public=True, fieldset=fieldset)
+    return JSONResponse(status_code=200, content={
+        "users": {user_id: serialize(profile) for user_id, profile in profiles.items()},
+        "missing": [user_id for user_id in dict.fromkeys(ids) if user_id not in profiles],
     })
-    
-    json_compatible_data = jsonable_encoder(public_user_data)
-    return JSONResponse(status_code=200, content=json_compatible_data)
 
 
 @router.get("/users")
-async def search_users(q: str = None, skill: str = None, project: str = None, limit: int = 10, offset: int = 0):
+async def search_users(q: str = None, skill: str = None, project: str = None, limit: int = 10, offset: int = 0,
+                       fields: str = None, include: str = None):
     try:
         if limit > 15:
             limit = 15
+
+        # Search results are cards: no relations unless asked for
+        try:
+            fieldset = parse_fieldset(fields, include, public=True, default_relations=())
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
         
         activated_parameters = [i for i in [q, skill, project] if i is not None]
         validation_string = ""
@@ -205,45 +288,9 @@ async def search_users(q: str = None, skill: str = None, project: str = None, li
         if not validate_string(validation_string):
             return JSONResponse(status_code=400, content={"error": "Invalid search parameters"})
 
-        with get_db_session() as session:
-            query = session.query(User)
-
-            if q:
-                query = query.filter(
-                    or_(
-                        User.name.ilike(f"%{q}%"),
-                        User.username.ilike(f"%{q}%")
-                    )
-                )
-
-            if skill:
-                query = query.join(User.skills).filter(
-                    Skill.name.ilike(f"%{skill}%")
-                )
-
-            if project:
-                query = query.join(User.projects).filter(
-                    Project.name.ilike(f"%{project}%")
-                )
-            
-            users = query.offset(offset).limit(limit).all()
-
-            result = []
-            for user in users:
-                user_data = {
-                    "id": user.id,
-                    "username": user.username,
-                    "name": user.name,
-                    "avatar_url": user.avatar_url,
-                    "background_type": user.background_type,
-                    "background_value": user.background_value,
-                    "description": user.description,
-                    "badge": user.badge
-                }
-                result.append(user_data)
-
-            json_compatible_data = jsonable_encoder(result)
-            return JSONResponse(status_code=200, content=json_compatible_data)
+        cards = search_user_cards(q=q, skill=skill, project=project, limit=limit, offset=offset,
+                                  fieldset=fieldset)
+        return JSONResponse(status_code=200, content=serialize(cards))
     except Exception as e:
         logger.error(f"Error searching users: {str(e)}")
         return JSONResponse(status_code=500, content={"error": f"Failed to search users: {str(e)}"})
@@ -282,7 +329,7 @@ async def upload_avatar(context: AuthContext = Depends(get_auth_context), file:
 
     try:
         # Compress and resize image before saving
-        compressed_content = compress_image(file_content, max_size=(512, 512), quality=75)
+        compressed_content = await compress(file_content, max_size=(512, 512), quality=75)
 
         if os.path.exists(file_path):
             os.remove(file_path)
@@ -298,8 +345,11 @@ async def upload_avatar(context: AuthContext = Depends(get_auth_context), file:
 
         set_user(user_data)
 
-        json_compatible_data = jsonable_encoder(user_data)
-        return JSONResponse(status_code=200, content={"success": True, "user": json_compatible_data})
+        return JSONResponse(status_code=200, content={"success": True, "user": user_data})
+    except ImageQueueFull:
+        return _image_queue_full()
+    except ImageJobTimeout:
+        return _image_timed_out()
     except Exception as e:
         logger.error(f"Error uploading avatar: {str(e)}")
         return JSONResponse(status_code=500, content={"error": f"Failed to upload avatar: {str(e)}"})
@@ -409,7 +459,7 @@ async def create_contact_endpoint(request: Request, context: AuthContext = Depen
     if not user_id or error:
         return error
     
-    data = await request.json()
+    data = await read_json(request)
     if not data or "type" not in data or "value" not in data:
         return JSONResponse(status_code=400, content={"error": "Missing required fields"})
     
@@ -417,10 +467,7 @@ async def create_contact_endpoint(request: Request, context: AuthContext = Depen
     if not is_valid:
         return JSONResponse(status_code=400, content={"error": validation_error or "Invalid contact data"})
     
-    user_contacts = get_contacts(user_id)
-    user_data = get_user(user_id)
-    tier = user_data["premium_tier"]
-    is_available, message = validate_links_limit(user_contacts, tier)
+    is_available, message = _check_quota(user_id, premium_tier(context), "contacts", validate_contacts_limit)
     if not is_available:
         return JSONResponse(status_code=403, content={"error": "Premium subscription required for more than 3 contacts"})
     
@@ -445,7 +492,7 @@ async def update_contact(contact_id: int, request: Request, context: AuthContext
     if not user_id or error:
         return error
     
-    data = await request.json()
+    data = await read_json(request)
     if not data:
         return JSONResponse(status_code=400, content={"error": "No data provided"})
     
@@ -541,7 +588,7 @@ async def create_project_endpoint(request: Request, context: AuthContext = Depen
     if not user_id or error:
         return error
     
-    data = await request.json()
+    data = await read_json(request)
     if not data or "name" not in data:
         return JSONResponse(status_code=400, content={"error": "Missing required fields"})
     
@@ -549,10 +596,7 @@ async def create_project_endpoint(request: Request, context: AuthContext = Depen
     if not is_valid:
         return JSONResponse(status_code=400, content={"error": validation_error or "Invalid project data"})
     
-    project_data = get_projects(user_id)
-    user_data = get_user(user_id)
-    tier = user_data["premium_tier"]
-    is_available, message = validate_projects_limit(project_data, tier)
+    is_available, message = _check_quota(user_id, premium_tier(context), "projects", validate_projects_limit)
     if not is_available:
         return JSONResponse(status_code=400, content={"error": f"Reached limits: {message}"})
     
@@ -581,7 +625,7 @@ async def update_project_endpoint(project_id: int, request: Request, context: Au
     if not project or project.get("user_id") != user_id:
         return JSONResponse(status_code=404, content={"error": "Project not found"})
     
-    data = await request.json()
+    data = await read_json(request)
     if not data:
         return JSONResponse(status_code=400, content={"error": "No data provided"})
     
@@ -630,17 +674,15 @@ async def add_skill_to_user_endpoint(skill_id: int, context: AuthContext = Depen
     if not user_id or error:
         return error
     
-    user_data = get_user(user_id)
-    if user_data.get("premium_tier", 0) == 0:
+    if premium_tier(context) == 0:
         return JSONResponse(status_code=403, content={"error": "Premium subscription required for skills"})
     
     skill = get_skill_by_id(skill_id)
     if not skill:
         return JSONResponse(status_code=404, content={"error": "Skill not found"})
     
-    success = add_skill_to_user(user_id, skill_id)
-    if not success:
-        return JSONResponse(status_code=500, content={"error": "Failed to add skill to user"})
+    # Attaching a skill the user already has is a no-op, not an error
+    add_skill_to_user(user_id, skill_id)
     
     return JSONResponse(status_code=200, content={"success": True, "skill": skill})
     
@@ -651,9 +693,7 @@ async def remove_skill_from_user_endpoint(skill_id: int, context: AuthContext =
     if not user_id or error:
         return error
     
-    success = remove_skill_from_user(user_id, skill_id)
-    if not success:
-        return JSONResponse(status_code=500, content={"error": "Failed to remove skill from user"})
+    remove_skill_from_user(user_id, skill_id)
     
     return JSONResponse(status_code=204, content={})
 
@@ -664,7 +704,7 @@ async def get_skills_endpoint(q: str = None):
         if not validate_string(q):
             return JSONResponse(status_code=400, content={"error": "Invalid search parameters"})
         
-        with get_db_session() as session:
+        with get_read_session() as session:
             if q:
                 skill_search = get_skill_search()
                 skill_results = skill_search.search_skills(q)
@@ -732,11 +772,10 @@ async def create_skill_endpoint(request: Request, context: AuthContext = Depends
     if not user_id or error:
         return error
     
-    user_data = get_user(user_id)
-    if user_data.get("premium_tier", 0) == 0:
+    if premium_tier(context) == 0:
         return JSONResponse(status_code=403, content={"error": "Premium subscription required for skills"})
     
-    data = await request.json()
+    data = await read_json(request)
     if not data or "name" not in data:
         return JSONResponse(status_code=400, content={"error": "Missing required fields"})
     
@@ -747,29 +786,20 @@ async def create_skill_endpoint(request: Request, context: AuthContext = Depends
             ).first()
             
             if existing_skill:
-                existing_user_skill = session.query(user_skill).filter_by(
-                    user_id=user_id, skill_id=existing_skill.id
-                ).first()
-                
-                if not existing_user_skill:
-                    session.execute(
-                        user_skill.insert().values(
-                            user_id=user_id,
-                            skill_id=existing_skill.id
-                        )
-                    )
-                    session.commit()
+                skill = {
+                    "id": existing_skill.id,
+                    "name": existing_skill.name,
+                    "description": existing_skill.description,
+                    "image_url": existing_skill.image_url,
+                    "is_predefined": existing_skill.is_predefined
+                }
+                # Read the skill first: the helper commits and closes the shared scoped session
+                add_skill_to_user(user_id, existing_skill.id)
                 
                 return JSONResponse(status_code=200, content={
                     "success": True,
                     "message": "Existing skill added to user",
-                    "skill": {
-                        "id": existing_skill.id,
-                        "name": existing_skill.name,
-                        "description": existing_skill.description,
-                        "image_url": existing_skill.image_url,
-                        "is_predefined": existing_skill.is_predefined
-                    }
+                    "skill": skill
                 })
             
             skill_search = get_skill_search()
@@ -792,9 +822,7 @@ async def create_skill_endpoint(request: Request, context: AuthContext = Depends
                 )
                 msg = "Custom skill created and added to user"
             
-            skills_data = get_skills(user_id)
-            tier = user_data["premium_tier"]
-            is_available, message = validate_skills_limit(skills_data, tier=tier)
+            is_available, message = _check_quota(user_id, premium_tier(context), "skills", validate_skills_limit)
             if not is_available:
                 return JSONResponse(status_code=403, content=f"Reached limit: {message}")
 
@@ -808,6 +836,7 @@ async def create_skill_endpoint(request: Request, context: AuthContext = Depends
                     skill_id=new_skill.id
                 )
             )
+            mark_user_written(session, user_id, "skills")
             session.commit()
             
             return JSONResponse(status_code=201, content={
@@ -836,8 +865,7 @@ async def upload_skill_image(
     if not user_id or error:
         return error
     
-    user_data = get_user(user_id)
-    if user_data.get("premium_tier", 0) == 0:
+    if premium_tier(context) == 0:
         return JSONResponse(status_code=403, content={"error": "Premium subscription required for skills"})
     
     if file.filename == '':
@@ -872,7 +900,7 @@ async def upload_skill_image(
     
     try:
         # Compress and resize image before saving
-        compressed_content = compress_image(file_content, max_size=(512, 512), quality=75)
+        compressed_content = await compress(file_content, max_size=(512, 512), quality=75)
 
         if os.path.exists(file_path):
             os.remove(file_path)
@@ -885,6 +913,10 @@ async def upload_skill_image(
             "success": True,
             "image_url": image_url
         })
+    except ImageQueueFull:
+        return _image_queue_full()
+    except ImageJobTimeout:
+        return _image_timed_out()
     except Exception as e:
         logger.error(f"Error saving skill image: {str(e)}")
         return JSONResponse(status_code=500, content={"error": f"Failed to save skill image: {str(e)}"})
@@ -0,0 +1,6 @@
+"""
+Micro-benchmarks for hot paths.
+
+Each module is runnable on its own, e.g. ``python -m app.benchmarks.read_paths``.
+They build their own throwaway SQLite database unless given ``--database-url``.
+"""
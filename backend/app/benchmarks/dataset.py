@@ -0,0 +1,197 @@
+"""
+Synthetic cards for scale testing.
+
+Generates users with contacts, projects, custom links and skills in the
+``app.db.export`` NDJSON format. Skills come from the ``skills.json`` catalog
+with Zipf-distributed popularity (catalog order is the popularity rank), and
+names, bios and project descriptions have realistic lengths. Output is fully
+determined by ``--seed`` and ``--users``.
+
+    python -m app.benchmarks.dataset --scale 10k --output cards.ndjson
+    python -m app.benchmarks.dataset --scale 1m --database-url sqlite:///scale.db
+    python -m app.benchmarks.dataset --users 50000 --database-url postgresql://localhost/quick_cards
+"""
+import argparse
+import bisect
+import itertools
+import json
+import logging
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import create_engine
+
+from app.core.search import SKILLS_DATA_PATH
+from app.core.serialization import dumps
+from app.db.bulk_import import IMPORT_BATCH_SIZE, ImportReport, import_cards
+from app.db.models import Base
+
+logger = logging.getLogger(__name__)
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# Telegram-like ids: increasing, with gaps
+FIRST_USER_ID = 100_000_000
+ZIPF_EXPONENT = 1.07
+
+FIRST_NAMES = (
+    "Alex", "Maria", "Ivan", "Anna", "Dmitry", "Elena", "Sergey", "Olga", "John", "Emma", "Liam", "Sofia",
+    "Noah", "Mia", "Lucas", "Chloe", "Mateo", "Aisha", "Omar", "Fatima", "Wei", "Mei", "Hiroshi", "Yuki",
+    "Arjun", "Priya", "Kwame", "Amara", "Jonas", "Lena", "Pavel", "Daria", "Nikita", "Polina", "Artem", "Ksenia",
+)
+LAST_NAMES = (
+    "Ivanov", "Smirnova", "Kuznetsov", "Popova", "Smith", "Johnson", "Garcia", "Martinez", "Muller", "Schmidt",
+    "Rossi", "Bianchi", "Dubois", "Moreau", "Tanaka", "Suzuki", "Chen", "Wang", "Kim", "Park", "Singh", "Patel",
+    "Okafor", "Mensah", "Kowalski", "Nowak", "Novak", "Horvat", "Silva", "Santos", "Larsen", "Nielsen",
+)
+WORDS = (
+    "building", "products", "for", "the", "web", "and", "mobile", "with", "a", "focus", "on", "performance",
+    "design", "systems", "data", "open", "source", "teams", "startup", "backend", "frontend", "api", "cloud",
+    "scalable", "clean", "code", "users", "experience", "learning", "machine", "research", "tools", "developer",
+    "platform", "community", "growth", "analytics", "automation", "security", "infrastructure", "in", "of",
+    "to", "my", "our", "new", "fast", "simple", "reliable", "telegram", "bots", "mini", "apps", "games",
+)
+PROJECT_WORDS = (
+    "Cards", "Pulse", "Nova", "Orbit", "Atlas", "Flow", "Forge", "Lens", "Relay", "Spark", "Stack", "Vault",
+    "Beacon", "Harbor", "Quill", "Echo", "Nimbus", "Ember", "Pixel", "Signal", "Bridge", "Canvas",
+)
+ROLES = ("Founder", "Developer", "Designer", "Product Manager", "Contributor", "Maintainer", "CTO", None)
+CONTACT_TYPES = ("telegram", "email", "phone", "github", "linkedin", "website")
+LINK_TITLES = ("Portfolio", "Blog", "GitHub", "Dribbble", "Behance", "YouTube", "Resume", "Newsletter")
+BACKGROUND_COLORS = ("#FFFFFF", "#F5F5F5", "#1E1E1E", "#0F62FE", "#FF7A59", "#2EC4B6")
+
+
+def load_catalog() -> List[str]:
+    """Skill names in catalog order, which doubles as popularity rank."""
+    with open(SKILLS_DATA_PATH, encoding="utf-8") as f:
+        return [skill["name"] for skill in json.load(f).values()]
+
+
+class ZipfSampler:
+    """Draws items with probability proportional to ``1 / rank ** exponent``."""
+
+    def __init__(self, items: List[Any], exponent: float = ZIPF_EXPONENT):
+        self.items = items
+        self.cumulative = list(itertools.accumulate(1 / rank ** exponent for rank in range(1, len(items) + 1)))
+
+    def sample(self, rng: random.Random, k: int) -> List[Any]:
+        """``k`` distinct items, more popular ones first more often."""
+        total = self.cumulative[-1]
+        chosen = {}
+        while len(chosen) < min(k, len(self.items)):
+            index = bisect.bisect_left(self.cumulative, rng.random() * total)
+            chosen.setdefault(index, self.items[index])
+        return list(chosen.values())
+
+
+def _text(rng: random.Random, min_words: int, max_words: int) -> str:
+    words = rng.choices(WORDS, k=rng.randint(min_words, max_words))
+    return " ".join(words).capitalize() + "."
+
+
+def _count(rng: random.Random, weights) -> int:
+    return rng.choices(range(len(weights)), weights=weights)[0]
+
+
+def generate(users: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """Yield ``users`` card records in the export format."""
+    rng = random.Random(seed)
+    skills = ZipfSampler(load_catalog())
+    epoch = datetime(2023, 1, 1)
+    user_id = FIRST_USER_ID
+
+    for _ in range(users):
+        user_id += rng.randint(1, 16)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        created_at = epoch + timedelta(seconds=rng.randrange(3 * 365 * 86400))
+        tier = rng.choices((0, 1, 2, 3), weights=(90, 6, 3, 1))[0]
+
+        yield {
+            "id": user_id,
+            "username": f"{first.lower()}_{last.lower()}{rng.randrange(10000)}" if rng.random() < 0.85 else None,
+            "name": f"{first} {last}",
+            "created_at": created_at.isoformat(),
+            "updated_at": (created_at + timedelta(seconds=rng.randrange(90 * 86400))).isoformat(),
+            "premium_tier": tier,
+            "premium_expires_at": (created_at + timedelta(days=30 * rng.randint(1, 12))).isoformat() if tier else None,
+            "avatar_url": f"/files/profile/{user_id}.jpg" if rng.random() < 0.6 else None,
+            "background_type": "color",
+            "background_value": rng.choice(BACKGROUND_COLORS),
+            # Most people write a line or two, a few write a lot, many write nothing
+            "description": _text(rng, 4, rng.choice((12, 12, 30, 60))) if rng.random() < 0.7 else None,
+            "badge": rng.choice(("Open to work", "Hiring", "Mentor")) if rng.random() < 0.1 else None,
+            "reffed_by": None,
+            "referrals": _count(rng, (80, 12, 5, 2, 1)),
+            "is_banned": rng.random() < 0.002,
+            "is_new": rng.random() < 0.05,
+            "contacts": [
+                {
+                    "type": contact_type,
+                    "value": f"{first.lower()}.{last.lower()}{user_id % 1000}@example.com"
+                    if contact_type == "email" else f"{contact_type}:{first.lower()}{user_id % 100000}",
+                    "is_public": rng.random() < 0.8,
+                }
+                for contact_type in rng.sample(CONTACT_TYPES, _count(rng, (10, 35, 30, 15, 7, 3)))
+            ],
+            "projects": [
+                {
+                    "name": " ".join(rng.sample(PROJECT_WORDS, rng.randint(1, 3))),
+                    "description": _text(rng, 6, 60) if rng.random() < 0.8 else None,
+                    "avatar_url": None,
+                    "role": rng.choice(ROLES),
+                    "url": f"https://example.com/{user_id}/{n}" if rng.random() < 0.6 else None,
+                }
+                for n in range(_count(rng, (40, 30, 15, 8, 5, 2)))
+            ],
+            "skills": skills.sample(rng, _count(rng, (15, 10, 12, 14, 13, 11, 8, 6, 4, 3, 2, 1, 1))),
+            "custom_links": [
+                {"title": title, "url": f"https://example.com/{user_id}/{title.lower()}"}
+                for title in rng.sample(LINK_TITLES, _count(rng, (50, 25, 15, 7, 3)))
+            ],
+        }
+
+
+def seed_database(url: str, users: int, seed: int = 0, batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+    """Create the schema if needed and load ``users`` synthetic cards into ``url``."""
+    engine = create_engine(url)
+    try:
+        Base.metadata.create_all(engine)
+        return import_cards(generate(users, seed), engine, batch_size)
+    finally:
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--scale", choices=SCALES)
+    size.add_argument("--users", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--output", help="NDJSON file to write, or - for stdout")
+    target.add_argument("--database-url", help="Load straight into this database")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    users = SCALES[args.scale] if args.scale else args.users
+
+    if args.database_url:
+        report = seed_database(args.database_url, users, args.seed, args.batch_size)
+        logger.info(f"Loaded {report.users} users ({report.rows} rows) in {report.elapsed:.1f}s")
+        return
+
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for record in generate(users, args.seed):
+            output.write(dumps(record))
+            output.write(b"\n")
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Profile read path: ORM hydration + dict copies + jsonable_encoder versus Core
+rows mapped onto slotted records + ``serialize``, plus card search throughput.
+Seeds a temporary SQLite database from ``app.benchmarks.dataset`` unless
+``--database-url`` points at an existing one.
+
+    python -m app.benchmarks.read_paths --users 2000 --reads 5000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.benchmarks.dataset import FIRST_NAMES, load_catalog, seed_database
+from app.db.models import User, Contact, Project, CustomLink
+from app.db.reads import load_profile, load_user_cards, serialize
+
+
+def orm_profile(session, user_id):
+    """What /users/me did before: get_user + get_contacts/projects/skills/links."""
+    user = session.query(User).filter(User.id == user_id).first()
+    user_data = {column.name: getattr(user, column.name) for column in User.__table__.columns}
+    contacts = [
+        {"id": c.id, "user_id": c.user_id, "type": c.type, "value": c.value, "is_public": c.is_public}
+        for c in session.query(Contact).filter(Contact.user_id == user_id).all()
+    ]
+    projects = [
+        {"id": p.id, "user_id": p.user_id, "name": p.name, "description": p.description,
+         "avatar_url": p.avatar_url, "role": p.role, "url": p.url}
+        for p in session.query(Project).filter(Project.user_id == user_id).all()
+    ]
+    owner = session.query(User).filter(User.id == user_id).first()
+    skills = [
+        {"id": s.id, "name": s.name, "description": s.description, "image_url": s.image_url,
+         "is_predefined": s.is_predefined}
+        for s in owner.skills
+    ]
+    links = [
+        {"id": l.id, "user_id": l.user_id, "title": l.title, "url": l.url}
+        for l in session.query(CustomLink).filter(CustomLink.user_id == user_id).all()
+    ]
+    return {**user_data, "contacts": contacts, "projects": projects, "skills": skills, "custom_links": links}
+
+
+def run(factory, label, load, encode, user_ids):
+    # Each read gets a fresh session, like the real helpers do
+    start = time.perf_counter()
+    for user_id in user_ids:
+        session = factory()
+        try:
+            json.dumps(encode(load(session, user_id)))
+        finally:
+            session.close()
+    elapsed = time.perf_counter() - start
+
+    # Memory held by the loaded representation, e.g. for a batch of cards
+    session = factory()
+    tracemalloc.start()
+    try:
+        kept = [load(session, user_id) for user_id in user_ids[:500]]
+        session.expunge_all()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        session.close()
+
+    print(f"{label:<28} {len(user_ids) / elapsed:>8.0f} profiles/s"
+          f"   {current / 1024:>7.0f} KiB retained, {peak / 1024:>7.0f} KiB peak for {len(kept)} profiles")
+
+
+def run_search(factory, searches):
+    start = time.perf_counter()
+    for params in searches:
+        session = factory()
+        try:
+            json.dumps(serialize(load_user_cards(session, **params)))
+        finally:
+            session.close()
+    elapsed = time.perf_counter() - start
+    print(f"{'Card search':<28} {len(searches) / elapsed:>8.0f} searches/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Existing database to read (skips seeding)")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.database_url:
+        url = args.database_url
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+
+    if tmpdir is not None:
+        seed_database(url, args.users, args.seed)
+
+    engine = create_engine(url)
+    factory = sessionmaker(bind=engine)
+
+    with engine.connect() as conn:
+        all_ids = [row[0] for row in conn.execute(User.__table__.select().with_only_columns(User.id))]
+    rng = random.Random(args.seed)
+    user_ids = [rng.choice(all_ids) for _ in range(args.reads)]
+
+    # Both paths must produce the same payload shape
+    legacy = jsonable_encoder(orm_profile(factory(), user_ids[0]))
+    assert legacy.keys() == serialize(load_profile(factory(), user_ids[0])).keys()
+
+    run(factory, "ORM + dicts + encoder", orm_profile, jsonable_encoder, user_ids)
+    run(factory, "Core rows + slotted records", load_profile, serialize, user_ids)
+
+    # Popular and long-tail skills, and name fragments
+    catalog = load_catalog()
+    searches = [
+        rng.choice(({"skill": rng.choice(catalog[:10])}, {"skill": rng.choice(catalog)},
+                    {"q": rng.choice(FIRST_NAMES)[:4]}))
+        for _ in range(max(args.reads // 10, 1))
+    ]
+    run_search(factory, searches)
+
+    engine.dispose()
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Telegram initData verification: the old path (secret derived and initData
+parsed and HMAC-checked on every request) versus ``verify_init_data`` cold
+(cached secret, new initData every time) and warm (same mini-app session
+repeating its initData, served from the verified cache).
+
+    python -m app.benchmarks.telegram_auth --iterations 50000
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import time
+import urllib.parse
+
+from app.core.telegram_auth import BOT_TOKEN, clear_init_data_cache, extract_user_info, verify_init_data
+
+
+def sign(fields, bot_token):
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    fields = dict(fields, hash=hmac.new(secret, data_check_string.encode(), hashlib.sha256).hexdigest())
+    return urllib.parse.urlencode(fields)
+
+
+def init_data(n, bot_token):
+    user = {"id": 100_000_000 + n, "first_name": "Alex", "last_name": "Ivanov", "username": f"alex{n}",
+            "language_code": "en", "is_premium": False, "allows_write_to_pm": True,
+            "photo_url": f"https://t.me/i/userpic/320/{n}.svg"}
+    return sign({
+        "query_id": f"AAH{n:012d}",
+        "user": json.dumps(user, separators=(",", ":")),
+        "auth_date": str(int(time.time())),
+        "signature": "x" * 86,
+    }, bot_token)
+
+
+def legacy_verify(init_data, bot_token):
+    """What validate_telegram_data + extract_user_info did before."""
+    data = dict(urllib.parse.parse_qsl(init_data, strict_parsing=True))
+    received_hash = data.pop("hash")
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(data.items()))
+    secret = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    calculated = hmac.new(secret, data_check_string.encode(), hashlib.sha256).hexdigest()
+    assert hmac.compare_digest(calculated, received_hash)
+    data["hash"] = received_hash
+    return extract_user_info(data)
+
+
+def run(label, verify, samples):
+    start = time.perf_counter()
+    for sample in samples:
+        verify(sample)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {len(samples) / elapsed:>10.0f} verifications/s   {elapsed / len(samples) * 1e6:>6.1f} us each")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50000)
+    parser.add_argument("--sessions", type=int, default=100, help="Distinct initData strings on the warm path")
+    args = parser.parse_args()
+
+    unique = [init_data(n, BOT_TOKEN) for n in range(args.iterations)]
+    repeated = [unique[n % args.sessions] for n in range(args.iterations)]
+
+    assert legacy_verify(unique[0], BOT_TOKEN) == verify_init_data(unique[0])[3]
+    clear_init_data_cache()
+
+    run("Legacy (secret per call)", lambda s: legacy_verify(s, BOT_TOKEN), unique)
+    run("Cold (cached secret)", verify_init_data, unique)
+    clear_init_data_cache()
+    run("Warm (verified cache)", verify_init_data, repeated)
+
+
+if __name__ == "__main__":
+    main()
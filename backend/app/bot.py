@@ -3,6 +3,7 @@ from app.core.config import settings
 from telebot.types import WebAppInfo, InlineKeyboardMarkup, InlineKeyboardButton
 from app.db.functions import get_user, set_user, update_user_premium_status
 from app.constants import *
+from app.core.entitlements import offer_for_price
 from datetime import datetime, timedelta
 import requests
 import logging
@@ -14,10 +15,7 @@ logger = logging.getLogger(__name__)
 
 
 def get_premium_tier(amount_in_stars):
-    for tier in PREMIUM_TIERS:
-        if tier["price"] == amount_in_stars:
-            return tier
-    return None
+    return offer_for_price(amount_in_stars)
 
 # Handle /start command
 @bot.message_handler(commands=['start'])
@@ -0,0 +1,147 @@
+"""
+Premium tiers, features, prices and per-tier quotas as immutable lookup tables.
+
+Everything tier-dependent reads from here instead of scanning ``PREMIUM_TIERS``
+or querying ``premium_features``. Tiers, prices and quotas are constants built
+at import; this module imports nothing from the database layer, so validation
+code can use them freely. Only the feature table comes from the database: it
+is loaded on first use and rebuilt on ``reload()``, which happens automatically
+after a commit that changes a premium feature in this process. Readers always
+see one complete snapshot, since a reload swaps the whole table at once.
+
+Quotas are the number of items a tier may already have when adding another
+one; ``None`` means unlimited.
+"""
+import logging
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.constants import PREMIUM_TIERS
+
+logger = logging.getLogger(__name__)
+
+FREE_TIER = 0
+
+TIER_NAMES = MappingProxyType({0: "Free", 1: "Basic", 2: "Premium", 3: "Ultimate"})
+
+RESOURCES = ("contacts", "projects", "custom_links", "skills")
+
+# Paid tiers have no quotas
+FREE_QUOTAS = MappingProxyType({"contacts": 3, "projects": 3, "custom_links": 3, "skills": 0})
+PAID_QUOTAS = MappingProxyType({resource: None for resource in RESOURCES})
+
+QUOTAS = MappingProxyType({tier: FREE_QUOTAS if tier == FREE_TIER else PAID_QUOTAS for tier in TIER_NAMES})
+
+# PREMIUM_TIERS entries by tier and by price in stars
+OFFERS = MappingProxyType({item["tier"]: MappingProxyType(dict(item)) for item in PREMIUM_TIERS})
+OFFERS_BY_PRICE = MappingProxyType({offer["price"]: offer for offer in OFFERS.values()})
+PRICES = MappingProxyType({tier: offer["price"] for tier, offer in OFFERS.items()})
+
+
+@dataclass(frozen=True)
+class Feature:
+    id: int
+    name: str
+    description: Optional[str]
+    tier_required: int
+
+
+def _load_features() -> Tuple[Feature, ...]:
+    from app.db.models import PremiumFeature
+    from app.db.session import get_read_session
+
+    with get_read_session() as session:
+        rows = session.execute(
+            select(PremiumFeature.id, PremiumFeature.name, PremiumFeature.description, PremiumFeature.tier_required)
+            .order_by(PremiumFeature.id)
+        ).all()
+    return tuple(Feature(*row) for row in rows)
+
+
+def build_features(features: Tuple[Feature, ...]) -> Mapping[int, Tuple[Feature, ...]]:
+    """Features available at each tier, lower tiers' included."""
+    return MappingProxyType({
+        tier: tuple(feature for feature in features if feature.tier_required <= tier)
+        for tier in TIER_NAMES
+    })
+
+
+_features: Optional[Mapping[int, Tuple[Feature, ...]]] = None
+_lock = threading.Lock()
+
+
+def features() -> Mapping[int, Tuple[Feature, ...]]:
+    current = _features
+    if current is None:
+        current = reload()
+    return current
+
+
+def reload() -> Mapping[int, Tuple[Feature, ...]]:
+    """Rebuild the feature table from the ``premium_features`` table."""
+    global _features
+    with _lock:
+        _features = build_features(_load_features())
+        logger.info(f"Loaded entitlements: {len(_features[max(TIER_NAMES)])} features")
+        return _features
+
+
+def invalidate():
+    """Drop the feature table; the next lookup reloads it."""
+    global _features
+    _features = None
+
+
+def tier_name(tier: int) -> str:
+    return TIER_NAMES.get(tier, "Unknown")
+
+
+def is_valid_tier(tier) -> bool:
+    return tier in TIER_NAMES
+
+
+def tier_price(tier: int) -> Optional[int]:
+    return PRICES.get(tier)
+
+
+def offer_for_price(amount_in_stars: int) -> Optional[Mapping]:
+    return OFFERS_BY_PRICE.get(amount_in_stars)
+
+
+def features_for_tier(tier: int) -> Tuple[Feature, ...]:
+    return features().get(tier, ())
+
+
+def quota(tier: int, resource: str) -> Optional[int]:
+    """How many ``resource`` items ``tier`` may already have when adding another one."""
+    return QUOTAS.get(tier, FREE_QUOTAS)[resource]
+
+
+def within_quota(tier: int, resource: str, count: int) -> bool:
+    limit = quota(tier, resource)
+    return limit is None or count <= limit
+
+
+# Listening on every Session rather than app.db.session.SessionFactory keeps this
+# module free of database imports; premium features are matched by table name.
+@event.listens_for(Session, "after_flush")
+def _collect_feature_changes(session, flush_context):
+    if any(getattr(instance, "__tablename__", None) == "premium_features"
+           for instance in (*session.new, *session.dirty, *session.deleted)):
+        session.info["premium_features_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _reload_after_feature_changes(session):
+    if session.info.pop("premium_features_changed", False):
+        invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_feature_changes(session):
+    session.info.pop("premium_features_changed", None)
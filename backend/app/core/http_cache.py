@@ -0,0 +1,59 @@
+"""
+Conditional GET helpers for card endpoints.
+
+Card ETags are derived from ``users.profile_version``, which every committed
+write to a user or their relations bumps, so a client or proxy holding the
+current ETag gets a ``304`` after a single primary key lookup instead of a
+full profile load.
+"""
+import hashlib
+from typing import Dict, Optional
+
+from starlette.responses import Response
+
+from app.core.config import settings
+
+# Seconds Telegram webviews and proxies may reuse a public card without revalidating
+CARD_CACHE_MAX_AGE = getattr(settings, "CARD_CACHE_MAX_AGE", 60)
+
+PUBLIC_CARD_CACHE_CONTROL = f"public, max-age={CARD_CACHE_MAX_AGE}"
+# The owner's card must always be revalidated, they expect to see their edits
+OWN_CARD_CACHE_CONTROL = "private, no-cache"
+
+
+def representation(name: str, detail: Optional[str] = None) -> str:
+    """
+    Name of a card representation for ETags. ``detail`` (e.g. a fieldset key)
+    is hashed so the ETag stays short and free of commas.
+    """
+    if not detail:
+        return name
+    return f"{name}.{hashlib.blake2b(detail.encode(), digest_size=6).hexdigest()}"
+
+
+def profile_etag(user_id, version: int, variant: str = "public") -> str:
+    """Strong ETag for one representation (``variant``) of a user's card at ``version``."""
+    return f'"{variant}-{user_id}-{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """``If-None-Match`` uses the weak comparison, so ``W/`` prefixes are ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def cache_headers(etag: str, cache_control: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, cache_control))
@@ -0,0 +1,130 @@
+"""
+Image processing off the event loop.
+
+Decoding, LANCZOS resizing and JPEG optimisation run in a process pool of
+``IMAGE_POOL_WORKERS`` workers, so a large photo no longer stalls every other
+request on the worker. At most ``IMAGE_QUEUE_LIMIT`` jobs may be queued or
+running at once; past that ``compress`` raises ``ImageQueueFull`` right away
+instead of letting uploads pile up behind each other. A job counts against
+the limit until its worker is done with it, even after ``compress`` gave up
+waiting for it with ``ImageJobTimeout``.
+
+Workers are spawned rather than forked, since the parent holds database
+connections and threads; the pool starts on the first job. A worker that
+dies (e.g. out of memory on a decompression bomb) breaks the pool, and the
+next job starts a fresh one.
+"""
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from app.core.config import settings
+from app.core.metrics import counter, gauge, histogram
+
+logger = logging.getLogger(__name__)
+
+IMAGE_POOL_WORKERS = getattr(settings, "IMAGE_POOL_WORKERS", max(1, (os.cpu_count() or 2) // 2))
+IMAGE_QUEUE_LIMIT = getattr(settings, "IMAGE_QUEUE_LIMIT", 4 * IMAGE_POOL_WORKERS)
+IMAGE_JOB_TIMEOUT = getattr(settings, "IMAGE_JOB_TIMEOUT", 20.0)
+
+image_jobs_pending = gauge("image_jobs_pending", "Image jobs queued or running")
+image_job_seconds = histogram("image_job_seconds", "Image job time from submission to result")
+image_job_run_seconds = histogram("image_job_run_seconds", "Image job time spent in a worker")
+image_jobs_rejected = counter("image_jobs_rejected_total", "Image jobs rejected because the queue was full")
+image_jobs_timed_out = counter("image_jobs_timed_out_total", "Image jobs that outlived IMAGE_JOB_TIMEOUT")
+
+
+class ImageQueueFull(Exception):
+    pass
+
+
+class ImageJobTimeout(Exception):
+    pass
+
+
+def compress_image(image_bytes: bytes, max_size=(512, 512), quality=75) -> bytes:
+    image = Image.open(io.BytesIO(image_bytes))
+    image = image.convert("RGB")
+    image.thumbnail(max_size, Image.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def _timed_compress(image_bytes: bytes, max_size, quality) -> Tuple[bytes, float]:
+    start = time.perf_counter()
+    output = compress_image(image_bytes, max_size, quality)
+    return output, time.perf_counter() - start
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(IMAGE_QUEUE_LIMIT)
+
+
+def executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(IMAGE_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _discard(broken: ProcessPoolExecutor):
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def compress(image_bytes: bytes, max_size=(512, 512), quality=75) -> bytes:
+    """
+    ``compress_image`` in the process pool. Raises ``ImageQueueFull`` when the
+    queue is at its limit and ``ImageJobTimeout`` after ``IMAGE_JOB_TIMEOUT``.
+    """
+    if not _slots.acquire(blocking=False):
+        image_jobs_rejected.inc()
+        raise ImageQueueFull(f"{IMAGE_QUEUE_LIMIT} image jobs already pending")
+
+    image_jobs_pending.inc()
+    start = time.perf_counter()
+    pool = executor()
+    try:
+        job = pool.submit(_timed_compress, image_bytes, max_size, quality)
+    except BaseException as e:
+        _finish_job(None)
+        if isinstance(e, BrokenProcessPool):
+            _discard(pool)
+        raise
+    # A job that timed out keeps its worker busy until it ends, so its slot is
+    # only given back then
+    job.add_done_callback(_finish_job)
+
+    try:
+        output, run_seconds = await asyncio.wait_for(asyncio.wrap_future(job), IMAGE_JOB_TIMEOUT)
+    except asyncio.TimeoutError:
+        image_jobs_timed_out.inc()
+        raise ImageJobTimeout(f"Image job took longer than {IMAGE_JOB_TIMEOUT}s") from None
+    except BrokenProcessPool:
+        logger.error("Image worker died, restarting the pool")
+        _discard(pool)
+        raise
+
+    image_job_run_seconds.observe(run_seconds)
+    image_job_seconds.observe(time.perf_counter() - start)
+    return output
+
+
+def _finish_job(job):
+    image_jobs_pending.dec()
+    _slots.release()
@@ -0,0 +1,186 @@
+"""
+Event-loop lag measurement and stall detection.
+
+A heartbeat task sleeps ``LOOP_MONITOR_INTERVAL`` at a time and records how
+late it wakes up in ``event_loop_lag_seconds``. A watchdog thread watches the
+heartbeat: once it is overdue by ``LOOP_STALL_THRESHOLD``, whatever runs on
+the loop thread is blocking it, so the watchdog logs that thread's stack
+along with the running task and the requests in flight. Each stall is
+reported once.
+
+Test mode: with ``LOOP_BLOCK_FAIL_MS`` set, or inside ``fail_on_blocking(ms)``,
+a request during which the loop stalled for longer than that raises
+``EventLoopBlocked`` (see ``LoopMonitorMiddleware``), which fails the test
+that made it.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.metrics import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+LOOP_MONITOR_ENABLED = getattr(settings, "LOOP_MONITOR_ENABLED", True)
+LOOP_MONITOR_INTERVAL = getattr(settings, "LOOP_MONITOR_INTERVAL", 0.05)
+LOOP_STALL_THRESHOLD = getattr(settings, "LOOP_STALL_THRESHOLD", 0.1)
+
+loop_lag = histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop heartbeat woke up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+loop_stalls = counter("event_loop_stalls_total", "Event loop stalls longer than the threshold")
+
+_fail_after_ms: Optional[float] = getattr(settings, "LOOP_BLOCK_FAIL_MS", None)
+
+
+class EventLoopBlocked(AssertionError):
+    pass
+
+
+@dataclass
+class Stall:
+    started: float
+    task: str
+    stack: str
+    ended: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.ended or time.monotonic()) - self.started
+
+
+@dataclass
+class Watch:
+    """Stalls seen while one request was in flight."""
+    label: str
+    stalls: List[Stall] = field(default_factory=list)
+
+
+def _describe(task) -> str:
+    if task is None:
+        return "no task"
+    coro = task.get_coro()
+    return f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+
+
+class LoopMonitor:
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float = LOOP_MONITOR_INTERVAL,
+                 threshold: float = LOOP_STALL_THRESHOLD):
+        self.loop = loop
+        self.interval = interval
+        self.threshold = threshold
+        self._thread_id = threading.get_ident()
+        self._due = time.monotonic() + interval
+        self._stall: Optional[Stall] = None
+        self._watches: List[Watch] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._heartbeat = loop.create_task(self._beat(), name="loop-monitor-heartbeat")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def _beat(self):
+        try:
+            while True:
+                self._due = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                loop_lag.observe(max(0.0, now - self._due))
+                stall = self._stall
+                if stall is not None:
+                    stall.ended = now
+                    self._stall = None
+        finally:
+            self._stopped.set()
+
+    def _limit(self) -> float:
+        if _fail_after_ms is None:
+            return self.threshold
+        return min(self.threshold, _fail_after_ms / 1000)
+
+    def _watch(self):
+        while not self._stopped.wait(self._limit() / 2):
+            if self.loop.is_closed():
+                return
+            due = self._due
+            if self._stall is not None or time.monotonic() - due < self._limit():
+                continue
+
+            frame = sys._current_frames().get(self._thread_id)
+            stall = Stall(
+                started=due,
+                task=_describe(asyncio.current_task(self.loop)),
+                stack="".join(traceback.format_stack(frame)) if frame is not None else "",
+            )
+            # The heartbeat may have woken up meanwhile
+            if self._due != due:
+                continue
+            self._stall = stall
+            with self._lock:
+                watches = list(self._watches)
+            for watch in watches:
+                watch.stalls.append(stall)
+
+            loop_stalls.inc()
+            in_flight = ", ".join(watch.label for watch in watches) or "none"
+            logger.warning(f"Event loop blocked for over {self._limit() * 1000:.0f} ms in {stall.task}; "
+                           f"requests in flight: {in_flight}\n{stall.stack}")
+
+    @contextmanager
+    def watch(self, label: str):
+        """Collect the stalls that happen while the block runs."""
+        current = Watch(label)
+        with self._lock:
+            self._watches.append(current)
+        try:
+            yield current
+        finally:
+            with self._lock:
+                self._watches.remove(current)
+
+
+_monitors: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LoopMonitor]" = weakref.WeakKeyDictionary()
+
+
+def monitor() -> Optional[LoopMonitor]:
+    """The running loop's monitor, started on first use; ``None`` when disabled."""
+    if not LOOP_MONITOR_ENABLED and _fail_after_ms is None:
+        return None
+    loop = asyncio.get_running_loop()
+    current = _monitors.get(loop)
+    if current is None:
+        current = _monitors[loop] = LoopMonitor(loop)
+    return current
+
+
+@contextmanager
+def fail_on_blocking(max_ms: float):
+    """Test mode: requests that stall the loop longer than ``max_ms`` raise ``EventLoopBlocked``."""
+    global _fail_after_ms
+    previous, _fail_after_ms = _fail_after_ms, max_ms
+    try:
+        yield
+    finally:
+        _fail_after_ms = previous
+
+
+def check_stalls(watch: Watch):
+    """Raise ``EventLoopBlocked`` for the longest stall in ``watch`` if test mode is on and it's too long."""
+    if _fail_after_ms is None or not watch.stalls:
+        return
+    worst = max(watch.stalls, key=lambda stall: stall.duration)
+    if worst.duration * 1000 > _fail_after_ms:
+        raise EventLoopBlocked(
+            f"{watch.label} blocked the event loop for {worst.duration * 1000:.0f} ms "
+            f"(limit {_fail_after_ms:.0f} ms) in {worst.task}:\n{worst.stack}"
+        )
@@ -0,0 +1,53 @@
+"""
+Fast JSON encoding and decoding built on orjson.
+
+``JSONResponse`` is a drop-in replacement for the Starlette one that renders
+with orjson, so datetimes, dataclasses (including the slotted read records)
+and non-string dict keys serialize natively without ``jsonable_encoder``.
+``read_json`` parses a request body at most once per request, no matter how
+many dependencies and handlers ask for it.
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import JSONResponse as StarletteJSONResponse
+
+JSONDecodeError = orjson.JSONDecodeError
+
+_BODY_CACHE_KEY = "parsed_json_body"
+
+
+def _default(value):
+    # Types orjson doesn't handle on its own
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def loads(data) -> Any:
+    return orjson.loads(data)
+
+
+class JSONResponse(StarletteJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+async def read_json(request: Request) -> Any:
+    """Parse the request body as JSON, reusing the result if it was already parsed."""
+    # scope["state"] is shared by every Request object built for this request
+    state = request.scope.setdefault("state", {})
+    if _BODY_CACHE_KEY not in state:
+        state[_BODY_CACHE_KEY] = loads(await request.body())
+    return state[_BODY_CACHE_KEY]
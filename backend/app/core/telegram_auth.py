@@ -3,16 +3,40 @@ import hashlib
 import time
 import json
 import urllib.parse
+from functools import lru_cache
 from typing import Dict, Optional, Tuple
 import logging
 
 from app.core.config import settings
+from app.core.metrics import counter
+from app.core.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 BOT_TOKEN = settings.TELEGRAM_BOT_TOKEN
 
-def validate_telegram_data(init_data: str) -> Tuple[bool, Optional[Dict], str]:
+# initData older than this is rejected, and verified initData is cached at most until then
+INIT_DATA_MAX_AGE = getattr(settings, "TELEGRAM_INIT_DATA_MAX_AGE", 86400)
+INIT_DATA_CACHE_SIZE = getattr(settings, "TELEGRAM_INIT_DATA_CACHE_SIZE", 10000)
+
+cache_lookups = counter("auth_cache_lookups_total", "Auth cache lookups", ["cache", "result"])
+
+# Keyed by a digest of the whole initData string, never by its hash field alone,
+# so a cached entry can't be reused for initData with altered fields
+_verified = TTLCache(INIT_DATA_CACHE_SIZE)
+
+
+@lru_cache(maxsize=8)
+def secret_key(bot_token: str) -> bytes:
+    """HMAC key for WebApp initData; fixed per bot token, so derived once."""
+    return hmac.new(
+        key=b"WebAppData",
+        msg=bot_token.encode(),
+        digestmod=hashlib.sha256
+    ).digest()
+
+
+def _check_init_data(init_data: str, bot_token: str) -> Tuple[bool, Optional[Dict], str]:
     try:
         pairs = urllib.parse.parse_qsl(init_data, strict_parsing=True)
     except ValueError:
@@ -26,26 +50,64 @@ def validate_telegram_data(init_data: str) -> Tuple[bool, Optional[Dict], str]:
 
     data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(data.items()))
 
-    secret_key = hmac.new(
-        key=b"WebAppData",
-        msg=BOT_TOKEN.encode(),
-        digestmod=hashlib.sha256
-    ).digest()
-
     calculated = hmac.new(
-        key=secret_key,
+        key=secret_key(bot_token),
         msg=data_check_string.encode(),
         digestmod=hashlib.sha256
     ).hexdigest()
 
     if not hmac.compare_digest(calculated, received_hash):
         return False, None, "hash mismatch"
-    logger.info(f"Hash is valid")
+
+    try:
+        auth_date = int(data.get("auth_date", ""))
+    except ValueError:
+        return False, None, "auth_date missing"
+    if time.time() - auth_date > INIT_DATA_MAX_AGE:
+        return False, None, "init_data expired"
 
     data["hash"] = received_hash
     return True, data, ""
 
 
+def verify_init_data(init_data: str, bot_token: Optional[str] = None) -> Tuple[bool, Optional[Dict], str, Optional[Dict]]:
+    """
+    Validate WebApp initData and extract the user in one step:
+    ``(is_valid, data, error, user_info)``.
+
+    Verified initData is cached until it expires (``auth_date`` +
+    ``TELEGRAM_INIT_DATA_MAX_AGE``), so repeat requests from the same mini-app
+    session skip parsing and HMAC work. Callers get their own copies.
+    """
+    bot_token = bot_token or BOT_TOKEN
+    key = hashlib.blake2b(init_data.encode(), key=secret_key(bot_token), digest_size=16).digest()
+
+    cached = _verified.get(key)
+    if cached is not None:
+        cache_lookups.inc(cache="init_data", result="hit")
+        data, user_info = cached
+        return True, dict(data), "", dict(user_info)
+    cache_lookups.inc(cache="init_data", result="miss")
+
+    is_valid, data, error = _check_init_data(init_data, bot_token)
+    if not is_valid:
+        return False, None, error, None
+
+    user_info = extract_user_info(data)
+    if "error" not in user_info:
+        _verified.set(key, (dict(data), dict(user_info)), int(data["auth_date"]) + INIT_DATA_MAX_AGE)
+    return True, data, "", user_info
+
+
+def validate_telegram_data(init_data: str) -> Tuple[bool, Optional[Dict], str]:
+    is_valid, data, error, _ = verify_init_data(init_data)
+    return is_valid, data, error
+
+
+def clear_init_data_cache():
+    _verified.clear()
+
+
 def extract_user_info(data_dict: Dict) -> Dict:
     user_info = {}
     
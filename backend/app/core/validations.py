@@ -1,7 +1,8 @@
 import re
 from datetime import datetime
 
-ALLOWED_PREMIUM_TIERS = {0, 1, 2, 3}
+from app.core.entitlements import is_valid_tier, quota, within_quota
+
 ALLOWED_BACKGROUND_TYPES = {"color", "gradient", "image"}
 ALLOWED_CONTACT_TYPES = {"phone", "email", "telegram", "website"}
 
@@ -45,7 +46,7 @@ def validate_user_data(user_data: dict):
 
     tier = user_data.get("premium_tier")
     if tier is not None:
-        if tier not in ALLOWED_PREMIUM_TIERS:
+        if not is_valid_tier(tier):
             return False, "Invalid premium tier"
 
     btype = user_data.get("background_type")
@@ -170,31 +171,38 @@ def validate_project(project_data):
 
 def validate_user_premium_data(user_data: dict):
     tier = user_data.get("premium_tier", 0)
-    if tier == 0:
-        projects = user_data.get("projects", [])
-        links = user_data.get("custom_links", [])
-        skills = user_data.get("skills", [])
-        if isinstance(projects, list) and len(projects) >= 3:
-            return False, "Non-premium users can add up to 3 projects"
-        if isinstance(links, list) and len(links) >= 3:
-            return False, "Non-premium users can add up to 3 custom links"
+    projects = user_data.get("projects", [])
+    links = user_data.get("custom_links", [])
+    if isinstance(projects, list) and not within_quota(tier, "projects", len(projects) + 1):
+        return False, f"Non-premium users can add up to {quota(tier, 'projects')} projects"
+    if isinstance(links, list) and not within_quota(tier, "custom_links", len(links) + 1):
+        return False, f"Non-premium users can add up to {quota(tier, 'custom_links')} custom links"
     return True, None
 
 
+def _count(items) -> int:
+    # Callers pass either the items or their count
+    if isinstance(items, int):
+        return items
+    return len(items) if isinstance(items, list) else 0
+
+
 def validate_projects_limit(projects_data, tier=0):
-    if tier == 0:
-        if isinstance(projects_data, list) and len(projects_data) > 3:
-            return False, "Non-premium users can add up to 3 projects. Upgrade to premium for more."
+    if not within_quota(tier, "projects", _count(projects_data)):
+        return False, f"Non-premium users can add up to {quota(tier, 'projects')} projects. Upgrade to premium for more."
     return True, None
 
 def validate_links_limit(links_data, tier=0):
-    if tier == 0:
-        if isinstance(links_data, list) and len(links_data) > 3:
-            return False, "Non-premium users can add up to 3 custom links. Upgrade to premium for more."
+    if not within_quota(tier, "custom_links", _count(links_data)):
+        return False, f"Non-premium users can add up to {quota(tier, 'custom_links')} custom links. Upgrade to premium for more."
+    return True, None
+
+def validate_contacts_limit(contacts_data, tier=0):
+    if not within_quota(tier, "contacts", _count(contacts_data)):
+        return False, f"Non-premium users can add up to {quota(tier, 'contacts')} contacts. Upgrade to premium for more."
     return True, None
 
 def validate_skills_limit(skills_data, tier=0):
-    if tier == 0:
-        if skills_data:
-            return False, "Non-premium users cannot add skills to their profile. Upgrade to premium for this feature."
-    return True, None
\ No newline at end of file
+    if not within_quota(tier, "skills", _count(skills_data)):
+        return False, "Non-premium users cannot add skills to their profile. Upgrade to premium for this feature."
+    return True, None
@@ -1,5 +1,5 @@
 import logging
-from app.db.session import get_db_session
+from app.db.session import get_db_session, get_read_session
 from app.db.models import PremiumFeature, User, Contact, Project, Skill, CustomLink
 from app.db.init_data import PREMIUM_FEATURES
 from app.db.functions import (
@@ -9,6 +9,7 @@ from app.db.functions import (
     get_user,
     set_user,
     create_user,
+    sign_in_user,
     
     # Contact functions
     get_contacts,
@@ -29,6 +30,8 @@ from app.db.functions import (
     create_skill,
     add_skill_to_user,
     remove_skill_from_user,
+    add_skills_to_user,
+    remove_skills_from_user,
     create_skill_and_add_to_user,
     
     # CustomLink functions
@@ -44,6 +47,7 @@ from app.db.functions import (
     create_premium_feature,
     
     # Premium functions
+    get_entitlements,
     update_user_premium_status
 )
 
@@ -51,12 +55,14 @@ from app.db.functions import (
 __all__ = [
     # Database session objects
     'get_db_session',
+    'get_read_session',
     # Helper functions
     
     # User functions
     'get_user',
     'set_user',
     'create_user',
+    'sign_in_user',
     
     # Contact functions
     'get_contacts',
@@ -77,6 +83,8 @@ __all__ = [
     'create_skill',
     'add_skill_to_user',
     'remove_skill_from_user',
+    'add_skills_to_user',
+    'remove_skills_from_user',
     'create_skill_and_add_to_user',
     
     # CustomLink functions
@@ -91,5 +99,6 @@ __all__ = [
     'set_premium_feature',
     'create_premium_feature',
 
+    'get_entitlements',
     'update_user_premium_status'
 ]
\ No newline at end of file
@@ -0,0 +1,302 @@
+"""
+Bulk import of cards from NDJSON (the format ``app.db.export`` writes) or CSV.
+
+Records are written in batches, one transaction per batch: ``COPY`` on
+Postgres and ``executemany`` elsewhere, instead of one ``create_*`` call and
+one session per row. Skill names are resolved through the skill catalog once
+per distinct name, and users that already exist are skipped, so an
+interrupted import can simply be run again.
+
+CSV files have one row per user with the user columns; ``contacts``,
+``projects``, ``skills`` and ``custom_links`` columns hold JSON arrays in the
+export format (skills may also be plain names).
+
+    python -m app.db.bulk_import cards.ndjson
+    python -m app.db.bulk_import cards.csv --format csv --database-url postgresql://...
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.search import get_skill_search
+from app.core.serialization import loads
+from app.db.functions import _insert_ignore
+from app.db.models import User, Contact, Project, Skill, CustomLink, user_skill
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = getattr(settings, "IMPORT_BATCH_SIZE", 1000)
+
+USER_COLUMNS = ("id", "username", "name", "created_at", "updated_at", "premium_tier", "premium_expires_at",
+                "avatar_url", "background_type", "background_value", "description", "badge",
+                "reffed_by", "referrals", "is_banned", "is_new")
+CONTACT_COLUMNS = ("user_id", "type", "value", "is_public")
+PROJECT_COLUMNS = ("user_id", "name", "description", "avatar_url", "role", "url")
+CUSTOM_LINK_COLUMNS = ("user_id", "title", "url")
+USER_SKILL_COLUMNS = ("user_id", "skill_id")
+
+RELATIONS = ("contacts", "projects", "skills", "custom_links")
+
+
+@dataclass
+class ImportReport:
+    users: int = 0
+    skipped: int = 0
+    contacts: int = 0
+    projects: int = 0
+    skills: int = 0
+    custom_links: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return self.users + self.contacts + self.projects + self.skills + self.custom_links
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def read_ndjson(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    for line in stream:
+        if line.strip():
+            yield loads(line)
+
+
+def read_csv(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    for row in csv.DictReader(stream):
+        record = dict(row)
+        for relation in RELATIONS:
+            value = (record.get(relation) or "").strip()
+            if not value:
+                record[relation] = []
+            elif relation == "skills" and not value.startswith("["):
+                record[relation] = [name.strip() for name in value.split(";")]
+            else:
+                record[relation] = json.loads(value)
+        yield record
+
+
+def _coerce(column, value):
+    # CSV gives strings and NDJSON gives ISO dates; convert to what the column expects
+    if value is None or not isinstance(value, str):
+        return value
+    if value == "":
+        return None
+    python_type = column.type.python_type
+    if python_type is bool:
+        return value.strip().lower() in ("1", "true", "t", "yes", "y")
+    if python_type is int:
+        return int(value)
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _row(table, columns: Sequence[str], data: Dict[str, Any], **values) -> tuple:
+    row = []
+    for name in columns:
+        column = table.c[name]
+        value = values[name] if name in values else _coerce(column, data.get(name))
+        if value is None and column.default is not None and column.default.is_scalar:
+            value = column.default.arg
+        row.append(value)
+    return tuple(row)
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def _write_rows(session: Session, table, columns: Sequence[str], rows: List[tuple]):
+    if not rows:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_value(value) for value in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        cursor = session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN", buffer)
+        finally:
+            cursor.close()
+    else:
+        session.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+
+class SkillResolver:
+    """Maps skill names to ids, creating missing skills from the catalog in bulk."""
+
+    def __init__(self):
+        self.ids: Dict[str, Optional[int]] = {}
+
+    def resolve(self, session: Session, skills: Iterable[Dict[str, Any]]) -> Dict[str, Optional[int]]:
+        catalog = get_skill_search()
+        pending = {}
+        for skill in skills:
+            key = skill["name"].lower()
+            if key in self.ids or key in pending:
+                continue
+            predefined = catalog.get_predefined_skill(skill["name"])
+            if predefined:
+                pending[key] = {
+                    "name": predefined["name"],
+                    "description": predefined.get("description"),
+                    "image_url": predefined.get("image_url"),
+                    "is_predefined": True,
+                }
+            else:
+                pending[key] = {
+                    "name": skill["name"],
+                    "description": skill.get("description"),
+                    "image_url": skill.get("image_url"),
+                    "is_predefined": False,
+                }
+
+        if pending:
+            rows = list({row["name"]: row for row in pending.values()}.values())
+            session.execute(_insert_ignore(session, Skill.__table__), rows)
+            found = dict(session.execute(
+                select(Skill.name, Skill.id).where(Skill.name.in_([row["name"] for row in rows]))
+            ).all())
+            for key, row in pending.items():
+                self.ids[key] = found.get(row["name"])
+        return self.ids
+
+
+def _skills_of(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    skills = []
+    for item in record.get("skills") or []:
+        skill = item if isinstance(item, dict) else {"name": str(item)}
+        if skill.get("name") and skill["name"].strip():
+            skills.append(dict(skill, name=skill["name"].strip()))
+    return skills
+
+
+def _import_batch(session: Session, records: List[Dict[str, Any]], resolver: SkillResolver,
+                  report: ImportReport):
+    users_table = User.__table__
+    by_id = {}
+    for record in records:
+        by_id.setdefault(_coerce(users_table.c.id, record.get("id")), record)
+    by_id.pop(None, None)
+
+    existing = set(session.execute(select(User.id).where(User.id.in_(list(by_id)))).scalars())
+    report.skipped += len(records) - len(by_id) + len(existing)
+    records = [record for user_id, record in by_id.items() if user_id not in existing]
+    if not records:
+        return
+
+    skill_ids = resolver.resolve(session, (skill for record in records for skill in _skills_of(record)))
+
+    now = datetime.utcnow()
+    users, contacts, projects, custom_links, user_skills = [], [], [], [], set()
+    for record in records:
+        user_id = _coerce(users_table.c.id, record["id"])
+        user = dict(record)
+        user["created_at"] = _coerce(users_table.c.created_at, record.get("created_at")) or now
+        user["updated_at"] = _coerce(users_table.c.updated_at, record.get("updated_at")) or now
+        users.append(_row(users_table, USER_COLUMNS, user, id=user_id))
+        contacts.extend(_row(Contact.__table__, CONTACT_COLUMNS, item, user_id=user_id)
+                        for item in record.get("contacts") or [])
+        projects.extend(_row(Project.__table__, PROJECT_COLUMNS, item, user_id=user_id)
+                        for item in record.get("projects") or [])
+        custom_links.extend(_row(CustomLink.__table__, CUSTOM_LINK_COLUMNS, item, user_id=user_id)
+                            for item in record.get("custom_links") or [])
+        for skill in _skills_of(record):
+            skill_id = skill_ids.get(skill["name"].lower())
+            if skill_id is not None:
+                user_skills.add((user_id, skill_id))
+
+    _write_rows(session, users_table, USER_COLUMNS, users)
+    _write_rows(session, Contact.__table__, CONTACT_COLUMNS, contacts)
+    _write_rows(session, Project.__table__, PROJECT_COLUMNS, projects)
+    _write_rows(session, CustomLink.__table__, CUSTOM_LINK_COLUMNS, custom_links)
+    _write_rows(session, user_skill, USER_SKILL_COLUMNS, sorted(user_skills))
+
+    report.users += len(users)
+    report.contacts += len(contacts)
+    report.projects += len(projects)
+    report.custom_links += len(custom_links)
+    report.skills += len(user_skills)
+
+
+def import_cards(records: Iterable[Dict[str, Any]], engine: Engine = None,
+                 batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+    """Import card records, committing every ``batch_size`` users."""
+    if engine is None:
+        from app.db.session import engine
+
+    report = ImportReport()
+    resolver = SkillResolver()
+    start = time.perf_counter()
+
+    def flush(batch):
+        with Session(bind=engine) as session, session.begin():
+            _import_batch(session, batch, resolver, report)
+        report.elapsed = time.perf_counter() - start
+        logger.info(f"Imported {report.users} users, skipped {report.skipped} "
+                    f"({report.rows} rows, {report.rows_per_second:.0f} rows/s)")
+
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import cards from NDJSON or CSV")
+    parser.add_argument("path", help="File to import, or - for stdin")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--database-url", help="Import into this database instead of the configured one")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    engine = create_engine(args.database_url) if args.database_url else None
+    stream = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8")
+    reader = read_csv if args.format == "csv" else read_ndjson
+    try:
+        report = import_cards(reader(stream), engine, args.batch_size)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    logger.info(
+        f"Done: {report.users} users, {report.contacts} contacts, {report.projects} projects, "
+        f"{report.skills} user skills, {report.custom_links} links; {report.skipped} skipped; "
+        f"{report.rows} rows in {report.elapsed:.1f}s ({report.rows_per_second:.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Request deadlines carried into the database.
+
+While a ``Deadline`` is current, every statement gets at most the time left:
+- PostgreSQL runs it with ``SET LOCAL statement_timeout`` sent in the same
+  round trip;
+- SQLite runs it under a progress handler that interrupts it once the
+  deadline passes.
+
+A statement issued after the deadline fails with ``DeadlineExceeded`` without
+reaching the database; ``Deadline.expire()`` ends a deadline early (e.g. when
+the client disconnects) so nothing more is sent. A statement that is already
+running is bounded by its own timeout only.
+
+Timeouts are recorded on the deadline (``exceeded``) as well as raised, since
+many handlers turn database errors into their own responses.
+"""
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.metrics import counter
+
+# SQLite VM instructions between deadline checks
+SQLITE_DEADLINE_CHECK_OPS = getattr(settings, "SQLITE_DEADLINE_CHECK_OPS", 1000)
+
+# PostgreSQL's query_canceled, raised for statement_timeout and cancel requests
+_PG_QUERY_CANCELED = "57014"
+
+statement_timeouts = counter("db_statement_timeouts_total", "Statements stopped by a request deadline", ["dialect"])
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    __slots__ = ("expires_at", "exceeded")
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+        self.exceeded = False
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expire(self):
+        """End the deadline now; later statements fail with ``DeadlineExceeded``."""
+        self.expires_at = min(self.expires_at, time.monotonic())
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Run the block under a deadline ``seconds`` from now."""
+    current = Deadline(seconds)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+
+
+def _is_timeout(dialect: str, error) -> bool:
+    if dialect == "postgresql":
+        return getattr(error, "pgcode", None) == _PG_QUERY_CANCELED
+    if dialect == "sqlite":
+        return isinstance(error, sqlite3.OperationalError) and "interrupted" in str(error)
+    return False
+
+
+@event.listens_for(Engine, "before_cursor_execute", retval=True)
+def _apply_deadline(conn, cursor, statement, parameters, context, executemany):
+    current = _current.get()
+    if current is None:
+        return statement, parameters
+
+    remaining = current.remaining()
+    if remaining <= 0:
+        current.exceeded = True
+        statement_timeouts.inc(dialect=conn.dialect.name)
+        raise DeadlineExceeded("Request deadline passed before the statement was sent")
+
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        # Server-side cursors wrap the statement in DECLARE, which takes only one
+        streaming = context is not None and context.execution_options.get("stream_results")
+        if not executemany and not streaming:
+            statement = f"SET LOCAL statement_timeout = {max(1, int(remaining * 1000))}; {statement}"
+    elif dialect == "sqlite":
+        conn.connection.dbapi_connection.set_progress_handler(
+            lambda: current.remaining() <= 0, SQLITE_DEADLINE_CHECK_OPS
+        )
+        conn.info["deadline_progress_handler"] = True
+    return statement, parameters
+
+
+def _clear(conn):
+    if conn.info.pop("deadline_progress_handler", False):
+        conn.connection.dbapi_connection.set_progress_handler(None, 0)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _clear_deadline(conn, cursor, statement, parameters, context, executemany):
+    _clear(conn)
+
+
+@event.listens_for(Engine, "handle_error")
+def _record_timeout(context):
+    conn = context.connection
+    if conn is not None:
+        _clear(conn)
+    current = _current.get()
+    if current is not None and _is_timeout(context.engine.dialect.name, context.original_exception):
+        current.exceeded = True
+        statement_timeouts.inc(dialect=context.engine.dialect.name)
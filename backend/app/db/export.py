@@ -0,0 +1,94 @@
+"""
+Streaming NDJSON export of every card: one line per user with its contacts,
+projects, skills and custom links, in the same flat shape as ``/users/me``.
+
+Users are read through a server-side cursor in id order and each batch gets
+its relations with one ``IN`` query per relation, so memory depends on the
+batch size rather than on the table size. Lines are ordered by user id; pass
+the last exported id as ``after_id`` to resume an interrupted export.
+
+    python -m app.db.export --output cards.ndjson
+    python -m app.db.export --after-id 123456 >> cards.ndjson
+"""
+import argparse
+import logging
+import sys
+import time
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.serialization import dumps
+from app.db.models import User
+from app.db.reads import USER_COLUMNS, UserRecord, load_relations, serialize
+from app.db.session import get_read_session
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = getattr(settings, "EXPORT_BATCH_SIZE", 500)
+
+
+def users_statement(after_id: Optional[int] = None):
+    statement = select(*USER_COLUMNS).order_by(User.id)
+    if after_id is not None:
+        statement = statement.where(User.id > after_id)
+    return statement
+
+
+def iter_export_batches(session, after_id: Optional[int] = None,
+                        batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Tuple[int, int, bytes]]:
+    """Yield ``(last user id, user count, NDJSON chunk)`` per batch of users."""
+    result = session.execute(
+        users_statement(after_id),
+        execution_options={"stream_results": True, "max_row_buffer": batch_size},
+    )
+    for rows in result.partitions(batch_size):
+        users = [UserRecord(*row) for row in rows]
+        profiles = load_relations(session, [user.id for user in users])
+
+        lines = []
+        for user in users:
+            profile = profiles[user.id]
+            profile.user = user
+            lines.append(dumps(serialize(profile)))
+        lines.append(b"")
+        yield users[-1].id, len(users), b"\n".join(lines)
+
+
+def iter_export(after_id: Optional[int] = None, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Export through a read session; the generator must be consumed from a single thread."""
+    with get_read_session() as session:
+        for _, _, chunk in iter_export_batches(session, after_id, batch_size):
+            yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export all cards as NDJSON")
+    parser.add_argument("--after-id", type=int, help="Resume after this user id")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    parser.add_argument("--output", help="File to write (default: stdout)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    output = open(args.output, "ab") if args.output else sys.stdout.buffer
+    start = time.perf_counter()
+    exported = 0
+    try:
+        with get_read_session() as session:
+            for last_id, count, chunk in iter_export_batches(session, args.after_id, args.batch_size):
+                output.write(chunk)
+                output.flush()
+                exported += count
+                logger.info(f"Exported {exported} users, resume with --after-id {last_id}")
+    finally:
+        if args.output:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Exported {exported} users in {elapsed:.1f}s ({exported / elapsed if elapsed else 0:.0f} users/s)")
+
+
+if __name__ == "__main__":
+    main()
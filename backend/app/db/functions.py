@@ -1,11 +1,14 @@
 import logging
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, List, Optional, Tuple, Union, Any
+from sqlalchemy import literal, select, true, union_all
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm.exc import NoResultFound
 
 from datetime import datetime, timedelta
-from app.db.session import get_db_session
-from app.db.models import User, Contact, Project, Skill, CustomLink, PremiumFeature
+from app.db.session import get_db_session, get_read_session, mark_user_written
+from app.db.models import PROFILE_SECTIONS, User, Contact, Project, Skill, CustomLink, PremiumFeature, user_skill
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +16,7 @@ logger = logging.getLogger(__name__)
 def get_user(user_id: str) -> Optional[Dict[str, Any]]:
     """Get user data by user_id."""
     try:
-        with get_db_session() as session:
+        with get_read_session(user_id) as session:
             user = session.query(User).filter(User.id == user_id).first()
             if not user:
                 logger.warning(f"User not found: {user_id}")
@@ -94,11 +97,68 @@ def create_user(user_id: str, **kwargs) -> bool:
         logger.error(f"Database error while creating user: {str(e)}")
         raise
 
+USER_FIELDS = ("id", "username", "name", "created_at", "updated_at", "premium_tier", "premium_expires_at",
+               "avatar_url", "background_type", "background_value", "description", "badge",
+               "reffed_by", "referrals", "is_banned", "is_new", "entitlement_version")
+
+def sign_in_user(user_id: str, **defaults) -> Tuple[Dict[str, Any], bool]:
+    """
+    Get a user for sign-in, creating them with ``defaults`` if they don't exist.
+    Returns ``(user, created)``.
+
+    On PostgreSQL this is a single ``INSERT ... ON CONFLICT DO NOTHING
+    RETURNING`` unioned with a select of the existing row (selected again if
+    a concurrent sign-in created it); other databases insert-or-ignore and
+    then select.
+    """
+    users = User.__table__
+    columns = [users.c[name] for name in USER_FIELDS]
+    values = {"id": user_id, **defaults}
+    try:
+        with get_db_session() as session:
+            if session.get_bind().dialect.name == "postgresql":
+                inserted = (
+                    postgresql_insert(users).values(**values)
+                    .on_conflict_do_nothing(index_elements=[users.c.id])
+                    .returning(*columns)
+                    .cte("inserted")
+                )
+                statement = union_all(
+                    select(inserted, literal(True).label("created")),
+                    select(*columns, literal(False).label("created")).where(users.c.id == user_id),
+                )
+                row = session.execute(statement).mappings().first()
+                if row is None:
+                    # A concurrent sign-in inserted the user after this statement's
+                    # snapshot was taken: the insert waited on it and hit the
+                    # conflict, and the outer select can't see its row. A new
+                    # statement gets a new snapshot.
+                    row = session.execute(select(*columns).where(users.c.id == user_id)).mappings().first()
+                    created = False
+                else:
+                    created = row["created"]
+            else:
+                created = session.execute(_insert_ignore(session, users).values(**values)).rowcount > 0
+                row = session.execute(select(*columns).where(users.c.id == user_id)).mappings().first()
+            user = {name: row[name] for name in USER_FIELDS}
+            if created:
+                # The ORM doesn't see Core inserts. Like a new ORM user, this pins
+                # the user's reads to the primary and starts every section at version 1.
+                for section in PROFILE_SECTIONS:
+                    mark_user_written(session, user_id, section)
+
+        if created:
+            logger.info(f"Created new user: {user_id}")
+        return user, created
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while signing in user {user_id}: {str(e)}")
+        raise
+
 # Contact functions
 def get_contacts(user_id: str) -> List[Dict[str, Any]]:
     """Get all contacts for a user."""
     try:
-        with get_db_session() as session:
+        with get_read_session(user_id) as session:
             contacts = session.query(Contact).filter(Contact.user_id == user_id).all()
             return [
                 {
@@ -117,7 +177,7 @@ def get_contacts(user_id: str) -> List[Dict[str, Any]]:
 def get_contact_by_id(contact_id: int) -> Optional[Dict[str, Any]]:
     """Get contact by id."""
     try:
-        with get_db_session() as session:
+        with get_read_session() as session:
             contact = session.query(Contact).filter(Contact.id == contact_id).first()
             if not contact:
                 logger.warning(f"Contact not found: {contact_id}")
@@ -211,7 +271,7 @@ def create_contact(user_id: str, contact_type: str, value: str, is_public: bool
 def get_projects(user_id: str) -> List[Dict[str, Any]]:
     """Get all projects for a user."""
     try:
-        with get_db_session() as session:
+        with get_read_session(user_id) as session:
             projects = session.query(Project).filter(Project.user_id == user_id).all()
             return [
                 {
@@ -232,7 +292,7 @@ def get_projects(user_id: str) -> List[Dict[str, Any]]:
 def get_project_by_id(project_id: int) -> Optional[Dict[str, Any]]:
     """Get project by id."""
     try:
-        with get_db_session() as session:
+        with get_read_session() as session:
             project = session.query(Project).filter(Project.id == project_id).first()
             if not project:
                 logger.warning(f"Project not found: {project_id}")
@@ -333,7 +393,7 @@ def create_project(user_id: str, name: str, description: str = None,
 def get_skill_by_id(skill_id: int) -> Optional[Dict[str, Any]]:
     """Get skill by id."""
     try:
-        with get_db_session() as session:
+        with get_read_session() as session:
             skill = session.query(Skill).filter(Skill.id == skill_id).first()
             if not skill:
                 logger.warning(f"Skill not found: {skill_id}")
@@ -353,7 +413,7 @@ def get_skill_by_id(skill_id: int) -> Optional[Dict[str, Any]]:
 def get_skills(user_id: str) -> List[Dict[str, Any]]:
     """Get all skills for a user."""
     try:
-        with get_db_session() as session:
+        with get_read_session(user_id) as session:
             user = session.query(User).filter(User.id == user_id).first()
             if not user:
                 logger.warning(f"User not found: {user_id}")
@@ -447,50 +507,86 @@ def create_skill(name: str, description: str = None, image_url: str = None, is_p
         logger.error(f"Database error while creating skill: {str(e)}")
         raise
 
+def _insert_ignore(session, table):
+    """INSERT ... ON CONFLICT DO NOTHING for the dialect the session is bound to."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql_insert(table).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite_insert(table).on_conflict_do_nothing()
+    raise NotImplementedError(f"INSERT ... ON CONFLICT is not supported for {dialect}")
+
+def _attach_skills(session, user_id: str, skill_ids: List[int]) -> int:
+    # Selecting the pair from users x skills makes unknown user or skill ids a
+    # no-op instead of an orphan row, still within a single statement
+    pairs = select(User.id, Skill.id).join_from(User, Skill, true()).where(
+        User.id == user_id,
+        Skill.id.in_(skill_ids)
+    )
+    statement = _insert_ignore(session, user_skill).from_select(["user_id", "skill_id"], pairs)
+    mark_user_written(session, user_id, "skills")
+    return session.execute(statement).rowcount
+
+def _detach_skills(session, user_id: str, skill_ids: List[int]) -> int:
+    statement = user_skill.delete().where(
+        user_skill.c.user_id == user_id,
+        user_skill.c.skill_id.in_(skill_ids)
+    )
+    mark_user_written(session, user_id, "skills")
+    return session.execute(statement).rowcount
+
 def add_skill_to_user(user_id: str, skill_id: int) -> bool:
-    """Add a skill to a user."""
+    """Add a skill to a user. Returns False if it was already attached or either id is unknown."""
     try:
         with get_db_session() as session:
-            user = session.query(User).filter(User.id == user_id).first()
-            if not user:
-                logger.warning(f"User not found: {user_id}")
-                return False
+            added = _attach_skills(session, user_id, [skill_id]) > 0
                 
-            skill = session.query(Skill).filter(Skill.id == skill_id).first()
-            if not skill:
-                logger.warning(f"Skill not found: {skill_id}")
-                return False
-                
-            if skill not in user.skills:
-                user.skills.append(skill)
-                
-        logger.info(f"Added skill {skill_id} to user {user_id}")
-        return True
+        if added:
+            logger.info(f"Added skill {skill_id} to user {user_id}")
+        return added
     except SQLAlchemyError as e:
         logger.error(f"Database error while adding skill {skill_id} to user {user_id}: {str(e)}")
         raise
 
 def remove_skill_from_user(user_id: str, skill_id: int) -> bool:
-    """Remove a skill from a user."""
+    """Remove a skill from a user. Returns False if it wasn't attached."""
     try:
         with get_db_session() as session:
-            user = session.query(User).filter(User.id == user_id).first()
-            if not user:
-                logger.warning(f"User not found: {user_id}")
-                return False
+            removed = _detach_skills(session, user_id, [skill_id]) > 0
                 
-            skill = session.query(Skill).filter(Skill.id == skill_id).first()
-            if not skill:
-                logger.warning(f"Skill not found: {skill_id}")
-                return False
+        if removed:
+            logger.info(f"Removed skill {skill_id} from user {user_id}")
+        return removed
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while removing skill {skill_id} from user {user_id}: {str(e)}")
+        raise
+
+def add_skills_to_user(user_id: str, skill_ids: List[int]) -> int:
+    """Attach many skills in one statement. Returns how many were newly attached."""
+    if not skill_ids:
+        return 0
+    try:
+        with get_db_session() as session:
+            added = _attach_skills(session, user_id, list(skill_ids))
                 
-            if skill in user.skills:
-                user.skills.remove(skill)
+        logger.info(f"Added {added} of {len(skill_ids)} skills to user {user_id}")
+        return added
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while adding skills {skill_ids} to user {user_id}: {str(e)}")
+        raise
+
+def remove_skills_from_user(user_id: str, skill_ids: List[int]) -> int:
+    """Detach many skills in one statement. Returns how many were removed."""
+    if not skill_ids:
+        return 0
+    try:
+        with get_db_session() as session:
+            removed = _detach_skills(session, user_id, list(skill_ids))
                 
-        logger.info(f"Removed skill {skill_id} from user {user_id}")
-        return True
+        logger.info(f"Removed {removed} of {len(skill_ids)} skills from user {user_id}")
+        return removed
     except SQLAlchemyError as e:
-        logger.error(f"Database error while removing skill {skill_id} from user {user_id}: {str(e)}")
+        logger.error(f"Database error while removing skills {skill_ids} from user {user_id}: {str(e)}")
         raise
 
 def create_skill_and_add_to_user(user_id: str, name: str, 
@@ -516,11 +612,8 @@ def create_skill_and_add_to_user(user_id: str, name: str,
         skill_data = create_skill(name, description, image_url, is_predefined)
         skill_id = skill_data["id"]
         
-        # Add skill to user
-        success = add_skill_to_user(user_id, skill_id)
-        if not success:
-            logger.warning(f"Failed to add skill {skill_id} to user {user_id}")
-            raise ValueError(f"Failed to add skill to user")
+        # Add skill to user, it's fine if the user already had it
+        add_skill_to_user(user_id, skill_id)
             
         logger.info(f"Created skill '{name}' and added to user {user_id}")
         return skill_data
@@ -532,7 +625,7 @@ def create_skill_and_add_to_user(user_id: str, name: str,
 def get_custom_links(user_id: str) -> List[Dict[str, Any]]:
     """Get all custom links for a user."""
     try:
-        with get_db_session() as session:
+        with get_read_session(user_id) as session:
             links = session.query(CustomLink).filter(CustomLink.user_id == user_id).all()
             return [
                 {
@@ -550,7 +643,7 @@ def get_custom_links(user_id: str) -> List[Dict[str, Any]]:
 def get_custom_link_by_id(link_id: int) -> Optional[Dict[str, Any]]:
     """Get custom link by id."""
     try:
-        with get_db_session() as session:
+        with get_read_session() as session:
             link = session.query(CustomLink).filter(CustomLink.id == link_id).first()
             if not link:
                 logger.warning(f"Custom link not found: {link_id}")
@@ -641,7 +734,7 @@ def create_custom_link(user_id: str, title: str, url: str) -> Dict[str, Any]:
 def get_premium_feature_by_id(feature_id: int) -> Optional[Dict[str, Any]]:
     """Get premium feature by id."""
     try:
-        with get_db_session() as session:
+        with get_read_session() as session:
             feature = session.query(PremiumFeature).filter(PremiumFeature.id == feature_id).first()
             if not feature:
                 logger.warning(f"Premium feature not found: {feature_id}")
@@ -660,7 +753,7 @@ def get_premium_feature_by_id(feature_id: int) -> Optional[Dict[str, Any]]:
 def get_premium_features_by_tier(tier: int) -> List[Dict[str, Any]]:
     """Get all premium features available for a given tier."""
     try:
-        with get_db_session() as session:
+        with get_read_session() as session:
             features = session.query(PremiumFeature).filter(PremiumFeature.tier_required <= tier).all()
             return [
                 {
@@ -750,21 +843,34 @@ def create_premium_feature(name: str, description: str, tier_required: int) -> D
         logger.error(f"Database error while creating premium feature: {str(e)}")
         raise
 
+def get_entitlements(user_id: str) -> Optional[Dict[str, Any]]:
+    """A user's premium tier, its expiry and entitlement version, read from the primary."""
+    try:
+        with get_db_session() as session:
+            row = session.execute(
+                select(User.premium_tier, User.premium_expires_at, User.entitlement_version)
+                .where(User.id == user_id)
+            ).mappings().first()
+            return dict(row) if row else None
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while retrieving entitlements for user {user_id}: {str(e)}")
+        raise
+
 def update_user_premium_status(user_id, tier):
     """Update user's premium status"""
     try:
-        # Get current user data
-        user_data = get_user(user_id)
-        if not user_data:
-            logger.error(f"User not found for ID: {user_id}")
-            return False
-        
-        # Update premium tier and expiration (30 days from now)
-        user_data["premium_tier"] = tier
-        user_data["premium_expires_at"] = datetime.now() + timedelta(days=30)
-        
-        # Save updated user data
-        set_user(user_data)
+        with get_db_session() as session:
+            user = session.query(User).filter(User.id == user_id).first()
+            if not user:
+                logger.error(f"User not found for ID: {user_id}")
+                return False
+
+            # Update premium tier and expiration (30 days from now)
+            user.premium_tier = tier
+            user.premium_expires_at = datetime.now() + timedelta(days=30)
+            # Tokens issued before this carry the old tier; bumping the version makes them refresh
+            user.entitlement_version = User.entitlement_version + 1
+
         logger.info(f"Updated premium status for user {user_id} to tier {tier}")
         return True
     except Exception as e:
@@ -5,6 +5,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from app.db.session import SessionLocal, engine
 from app.db.models import Base, PremiumFeature
 from app.db.init_data import PREMIUM_FEATURES
+from app.db.migrations import upgrade
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,9 @@ def init_db():
         Base.metadata.create_all(bind=engine)
         logger.info("Created all tables")
 
+        # Step 2: Bring existing tables up to date (indexes, constraints)
+        upgrade(engine)
+
         all_tables = ['users', 'contacts', 'projects', 'skills', 'custom_links', 'premium_features', 'user_skill']
         for table in all_tables:
             if verify_table_exists(table):
@@ -0,0 +1,169 @@
+"""
+Versioned schema migrations.
+
+Revisions live in ``app/db/migrations/versions`` as ``vNNNN_<slug>.py`` modules
+exposing ``revision``, ``description`` and ``upgrade(engine)``. Applied
+revisions are recorded in the ``schema_migrations`` table, so ``upgrade`` only
+runs what is pending. A revision that can't be applied yet raises
+``RevisionPending``: it isn't recorded, later revisions still run, and the
+next ``upgrade`` tries it again. Revisions must be idempotent: on a fresh database
+``Base.metadata.create_all`` already builds the final schema and the revisions
+only get recorded.
+"""
+import importlib
+import logging
+import pkgutil
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_PACKAGE = "app.db.migrations.versions"
+
+# Arbitrary key for pg_advisory_lock so that several workers starting at once
+# don't run the same revision twice
+ADVISORY_LOCK_KEY = 724031026
+
+migrations_metadata = MetaData()
+
+
+class RevisionPending(Exception):
+    """Raised by a revision whose prerequisites are missing; it is retried on the next upgrade."""
+
+schema_migrations = Table(
+    "schema_migrations",
+    migrations_metadata,
+    Column("revision", String(32), primary_key=True),
+    Column("description", String, nullable=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def load_revisions() -> list:
+    """Import every revision module, ordered by revision id."""
+    package = importlib.import_module(VERSIONS_PACKAGE)
+    modules = []
+    for info in pkgutil.iter_modules(package.__path__):
+        if not info.name.startswith("v"):
+            continue
+        modules.append(importlib.import_module(f"{VERSIONS_PACKAGE}.{info.name}"))
+    modules.sort(key=lambda module: module.revision)
+    return modules
+
+
+def applied_revisions(engine: Engine) -> List[str]:
+    schema_migrations.create(bind=engine, checkfirst=True)
+    with engine.connect() as conn:
+        return [row.revision for row in conn.execute(select(schema_migrations.c.revision))]
+
+
+def current_revision(engine: Engine) -> Optional[str]:
+    applied = applied_revisions(engine)
+    return max(applied) if applied else None
+
+
+@contextmanager
+def _migration_lock(engine: Engine):
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+
+
+def upgrade(engine: Engine, target: Optional[str] = None) -> List[str]:
+    """Apply pending revisions up to ``target`` (all of them by default)."""
+    applied_now = []
+
+    with _migration_lock(engine):
+        applied = set(applied_revisions(engine))
+
+        for module in load_revisions():
+            if module.revision in applied:
+                continue
+            if target is not None and module.revision > target:
+                break
+
+            logger.info(f"Applying migration {module.revision}: {module.description}")
+            try:
+                module.upgrade(engine)
+            except RevisionPending as e:
+                logger.warning(f"Migration {module.revision} left pending: {e}")
+                continue
+
+            with engine.begin() as conn:
+                conn.execute(schema_migrations.insert().values(
+                    revision=module.revision,
+                    description=module.description,
+                    applied_at=datetime.utcnow()
+                ))
+            applied_now.append(module.revision)
+
+    if applied_now:
+        logger.info(f"Applied migrations: {', '.join(applied_now)}")
+    else:
+        logger.info("Database schema is up to date")
+    return applied_now
+
+
+# Helpers for revision modules
+
+def has_index(engine: Engine, table: str, name: str) -> bool:
+    return any(index["name"] == name for index in inspect(engine).get_indexes(table))
+
+
+def has_column(engine: Engine, table: str, name: str) -> bool:
+    return any(column["name"] == name for column in inspect(engine).get_columns(table))
+
+
+def primary_key_columns(engine: Engine, table: str) -> List[str]:
+    return inspect(engine).get_pk_constraint(table).get("constrained_columns") or []
+
+
+def create_index(engine: Engine, name: str, table: str, columns: Sequence[str], unique: bool = False,
+                 using: Optional[str] = None):
+    """
+    Create an index without blocking writes. ``using`` picks the PostgreSQL
+    index method (``gin``, ...); column entries may carry an operator class.
+
+    On PostgreSQL this uses ``CREATE INDEX CONCURRENTLY``, which can't run inside
+    a transaction, so it goes through an autocommit connection. A concurrent
+    build that failed half way leaves an INVALID index behind; it is dropped
+    and rebuilt.
+    """
+    unique_sql = "UNIQUE " if unique else ""
+    columns_sql = ", ".join(columns)
+    using_sql = f"USING {using} " if using else ""
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            is_valid = conn.execute(text(
+                "SELECT i.indisvalid FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name"
+            ), {"name": name}).scalar()
+
+            if is_valid is False:
+                logger.warning(f"Dropping invalid index {name} left by an interrupted build")
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            elif is_valid:
+                return
+
+            conn.execute(text(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {using_sql}({columns_sql})"
+            ))
+        return
+
+    if has_index(engine, table, name):
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({columns_sql})"))
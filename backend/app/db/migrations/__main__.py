@@ -0,0 +1,34 @@
+"""
+Run schema migrations from the command line.
+
+    python -m app.db.migrations upgrade [--target REVISION]
+    python -m app.db.migrations current
+"""
+import argparse
+import logging
+
+from app.db.migrations import current_revision, upgrade
+from app.db.session import engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quick Cards schema migrations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    upgrade_parser = subparsers.add_parser("upgrade", help="Apply pending revisions")
+    upgrade_parser.add_argument("--target", default=None, help="Stop after this revision")
+
+    subparsers.add_parser("current", help="Print the latest applied revision")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "upgrade":
+        applied = upgrade(engine, target=args.target)
+        print(f"Applied {len(applied)} revision(s)")
+    else:
+        print(current_revision(engine) or "<none>")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Composite primary key on user_skill and indexes on every users.id foreign key.
+
+user_skill had no key at all, so duplicates were possible and every
+``(user_id, skill_id)`` lookup scanned the table. Duplicates and NULL rows are
+removed before the key is added.
+"""
+import logging
+
+from sqlalchemy import text
+
+from app.db.migrations import create_index, primary_key_columns
+
+logger = logging.getLogger(__name__)
+
+revision = "0001"
+description = "user_skill primary key and foreign key indexes"
+
+
+def _dedupe_user_skill(conn):
+    conn.execute(text("DELETE FROM user_skill WHERE user_id IS NULL OR skill_id IS NULL"))
+
+
+def _add_user_skill_pk_postgresql(engine):
+    with engine.begin() as conn:
+        _dedupe_user_skill(conn)
+        conn.execute(text(
+            "DELETE FROM user_skill a USING user_skill b "
+            "WHERE a.ctid > b.ctid AND a.user_id = b.user_id AND a.skill_id = b.skill_id"
+        ))
+
+    # Build the unique index without blocking writes, then promote it. Adding the
+    # constraint itself only takes a short lock because the index already exists.
+    create_index(engine, "user_skill_pkey", "user_skill", ["user_id", "skill_id"], unique=True)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "ALTER TABLE user_skill ADD CONSTRAINT user_skill_pkey PRIMARY KEY USING INDEX user_skill_pkey"
+        ))
+
+
+def _add_user_skill_pk_sqlite(engine):
+    # SQLite can't add a primary key to an existing table, so rebuild it
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE user_skill_new ("
+            "user_id BIGINT NOT NULL REFERENCES users (id), "
+            "skill_id INTEGER NOT NULL REFERENCES skills (id), "
+            "PRIMARY KEY (user_id, skill_id))"
+        ))
+        conn.execute(text(
+            "INSERT OR IGNORE INTO user_skill_new (user_id, skill_id) "
+            "SELECT user_id, skill_id FROM user_skill "
+            "WHERE user_id IS NOT NULL AND skill_id IS NOT NULL"
+        ))
+        conn.execute(text("DROP TABLE user_skill"))
+        conn.execute(text("ALTER TABLE user_skill_new RENAME TO user_skill"))
+
+
+def upgrade(engine):
+    if primary_key_columns(engine, "user_skill"):
+        logger.info("user_skill already has a primary key")
+    elif engine.dialect.name == "postgresql":
+        _add_user_skill_pk_postgresql(engine)
+    elif engine.dialect.name == "sqlite":
+        _add_user_skill_pk_sqlite(engine)
+    else:
+        raise NotImplementedError(f"No user_skill primary key migration for {engine.dialect.name}")
+
+    create_index(engine, "ix_user_skill_skill_id_user_id", "user_skill", ["skill_id", "user_id"])
+    create_index(engine, "ix_contacts_user_id", "contacts", ["user_id"])
+    create_index(engine, "ix_projects_user_id", "projects", ["user_id"])
+    create_index(engine, "ix_custom_links_user_id", "custom_links", ["user_id"])
@@ -0,0 +1,34 @@
+"""
+Trigram indexes for card search on PostgreSQL.
+
+Search filters with ``ILIKE '%term%'``, which a btree index can't serve, so
+every search scanned users (and projects for the project filter). GIN
+``gin_trgm_ops`` indexes let the planner use an index for infix matches.
+
+Needs the ``pg_trgm`` extension; if the database user can't create it the
+revision stays pending (``python -m app.db.query_plans`` reports the scans
+meanwhile) and the indexes are built on the first upgrade after it has been
+installed. Other databases have no equivalent and are left alone.
+"""
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.db.migrations import RevisionPending, create_index
+
+revision = "0002"
+description = "trigram indexes for card search"
+
+
+def upgrade(engine):
+    if engine.dialect.name != "postgresql":
+        return
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except DBAPIError as e:
+        raise RevisionPending(f"pg_trgm is not available, search will keep scanning users: {e}") from e
+
+    create_index(engine, "ix_users_name_trgm", "users", ["name gin_trgm_ops"], using="gin")
+    create_index(engine, "ix_users_username_trgm", "users", ["username gin_trgm_ops"], using="gin")
+    create_index(engine, "ix_projects_name_trgm", "projects", ["name gin_trgm_ops"], using="gin")
@@ -0,0 +1,19 @@
+"""
+``users.profile_version``, bumped whenever a user's card changes.
+
+Adding a NOT NULL column with a constant default doesn't rewrite the table on
+PostgreSQL 11+ or SQLite, so this is cheap on a large users table.
+"""
+from sqlalchemy import text
+
+from app.db.migrations import has_column
+
+revision = "0003"
+description = "users.profile_version"
+
+
+def upgrade(engine):
+    if has_column(engine, "users", "profile_version"):
+        return
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE users ADD COLUMN profile_version BIGINT NOT NULL DEFAULT 0"))
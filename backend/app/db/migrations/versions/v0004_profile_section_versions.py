@@ -0,0 +1,36 @@
+"""
+Per-section versions on users for delta sync of the owner's card.
+
+Each ``<section>_version`` holds the ``profile_version`` at which that section
+last changed. Existing rows start with every section at the current
+``profile_version``, so clients holding an older version get a full resync
+rather than missing changes made before this revision.
+"""
+from sqlalchemy import text
+
+from app.db.migrations import has_column
+from app.db.models import PROFILE_SECTIONS
+
+revision = "0004"
+description = "per-section profile versions"
+
+BATCH_SIZE = 5000
+
+
+def upgrade(engine):
+    columns = [f"{section}_version" for section in PROFILE_SECTIONS]
+    for column in columns:
+        if not has_column(engine, "users", column):
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE users ADD COLUMN {column} BIGINT NOT NULL DEFAULT 0"))
+
+    # Backfill in small batches so no transaction holds row locks on the whole table
+    assignments = ", ".join(f"{column} = profile_version" for column in columns)
+    while True:
+        with engine.begin() as conn:
+            updated = conn.execute(text(
+                f"UPDATE users SET {assignments} WHERE id IN ("
+                f"SELECT id FROM users WHERE user_version <> profile_version LIMIT {BATCH_SIZE})"
+            )).rowcount
+        if not updated:
+            break
@@ -0,0 +1,17 @@
+"""
+``users.entitlement_version``, bumped whenever a user's premium tier changes so
+tier claims in previously issued tokens stop being trusted.
+"""
+from sqlalchemy import text
+
+from app.db.migrations import has_column
+
+revision = "0005"
+description = "users.entitlement_version"
+
+
+def upgrade(engine):
+    if has_column(engine, "users", "entitlement_version"):
+        return
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE users ADD COLUMN entitlement_version BIGINT NOT NULL DEFAULT 0"))
@@ -1,15 +1,20 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, DateTime, Float, Table, BigInteger
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, DateTime, Float, Table, BigInteger, Index
 from sqlalchemy.sql import func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
 Base = declarative_base()
 
+# Parts of a card that change independently; each has a <section>_version column on users
+PROFILE_SECTIONS = ("user", "contacts", "projects", "skills", "custom_links")
+
 user_skill = Table(
     "user_skill",
     Base.metadata,
-    Column("user_id", BigInteger, ForeignKey("users.id")),
-    Column("skill_id", Integer, ForeignKey("skills.id"))
+    Column("user_id", BigInteger, ForeignKey("users.id"), primary_key=True),
+    Column("skill_id", Integer, ForeignKey("skills.id"), primary_key=True),
+    # The primary key covers lookups by user; this one covers lookups by skill
+    Index("ix_user_skill_skill_id_user_id", "skill_id", "user_id"),
 )
 
 class User(Base):
@@ -35,6 +40,17 @@ class User(Base):
     background_value = Column(String, default="#FFFFFF")  # color code, gradient info, or image URL
     description = Column(Text, nullable=True)
     badge = Column(String, nullable=True)
+
+    # Bumped on every commit that touches the user or their relations; drives ETags
+    profile_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # The profile_version at which each section last changed, for delta sync
+    user_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    contacts_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    projects_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    skills_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    custom_links_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # Bumped when the premium tier changes; tokens carrying an older one lose their tier claims
+    entitlement_version = Column(BigInteger, nullable=False, default=0, server_default="0")
     
     contacts = relationship("Contact", back_populates="user", cascade="all, delete-orphan")
     projects = relationship("Project", back_populates="user", cascade="all, delete-orphan")
@@ -46,7 +62,7 @@ class Contact(Base):
     __tablename__ = "contacts"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(BigInteger, ForeignKey("users.id"))
+    user_id = Column(BigInteger, ForeignKey("users.id"), index=True)
     type = Column(String)  # phone, email, etc.
     value = Column(String)
     is_public = Column(Boolean, default=True)
@@ -58,7 +74,7 @@ class Project(Base):
     __tablename__ = "projects"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(BigInteger, ForeignKey("users.id"))
+    user_id = Column(BigInteger, ForeignKey("users.id"), index=True)
     name = Column(String)
     description = Column(Text, nullable=True)
     avatar_url = Column(String, nullable=True)
@@ -97,7 +113,7 @@ class CustomLink(Base):
     __tablename__ = "custom_links"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(BigInteger, ForeignKey("users.id"))
+    user_id = Column(BigInteger, ForeignKey("users.id"), index=True)
     title = Column(String)
     url = Column(String)
     
@@ -0,0 +1,131 @@
+"""
+Connection pool configuration, instrumentation and warm-up.
+
+Pool settings come from ``settings`` (``DB_POOL_SIZE``, ``DB_MAX_OVERFLOW``,
+``DB_POOL_TIMEOUT``, ``DB_POOL_RECYCLE``, ``DB_POOL_PRE_PING``,
+``DB_POOL_WARMUP``) and fall back to the defaults below.
+"""
+import logging
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.metrics import counter, gauge, histogram
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = getattr(settings, "DB_POOL_SIZE", 5)
+MAX_OVERFLOW = getattr(settings, "DB_MAX_OVERFLOW", 10)
+POOL_TIMEOUT = getattr(settings, "DB_POOL_TIMEOUT", 10)
+POOL_RECYCLE = getattr(settings, "DB_POOL_RECYCLE", 1800)
+POOL_PRE_PING = getattr(settings, "DB_POOL_PRE_PING", True)
+# Connections opened at startup; defaults to the whole base pool
+POOL_WARMUP = getattr(settings, "DB_POOL_WARMUP", None)
+
+checkout_wait = histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+connections_in_use = gauge("db_pool_connections_in_use", "Connections currently checked out", ["pool"])
+pool_size_gauge = gauge("db_pool_size", "Configured base size of the pool", ["pool"])
+overflow_connects = counter(
+    "db_pool_overflow_connects_total", "Connections opened beyond the pool's base size", ["pool"]
+)
+checkout_timeouts = counter("db_pool_checkout_timeouts_total", "Checkouts that timed out", ["pool"])
+connects = counter("db_pool_connects_total", "New DBAPI connections opened", ["pool"])
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    label = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            checkout_timeouts.inc(pool=self.label)
+            raise
+        finally:
+            checkout_wait.observe(time.perf_counter() - start, pool=self.label)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.label = self.label
+        return pool
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Keyword arguments for ``create_engine`` with the configured pool settings."""
+    options = {"pool_pre_ping": POOL_PRE_PING}
+
+    # SQLite uses NullPool/SingletonThreadPool, which take no sizing options
+    if make_url(url).get_backend_name() == "sqlite":
+        return options
+
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+    )
+    return options
+
+
+def instrument_engine(engine: Engine, label: str):
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.label = label
+        pool_size_gauge.set(engine.pool.size(), pool=label)
+    connections_in_use.set(0, pool=label)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        connects.inc(pool=label)
+        # The pool counts a new connection before opening it, so a positive
+        # overflow here means this one is past the base size
+        pool = engine.pool
+        if isinstance(pool, QueuePool) and pool.overflow() > 0:
+            overflow_connects.inc(pool=label)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connections_in_use.inc(pool=label)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connections_in_use.dec(pool=label)
+
+
+def warm_up_pool(engine: Engine, connections: int = None) -> int:
+    """
+    Open pool connections ahead of traffic so the first requests after a deploy
+    don't pay for connection setup. Returns how many connections were opened.
+    """
+    if not isinstance(engine.pool, QueuePool):
+        return 0
+
+    if connections is None:
+        connections = POOL_WARMUP if POOL_WARMUP is not None else engine.pool.size()
+    connections = min(connections, engine.pool.size())
+
+    # Hold them all at once, otherwise the pool hands back the same connection
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+
+    logger.info(f"Warmed up {len(opened)} connection(s) for {engine.url.render_as_string(hide_password=True)}")
+    return len(opened)
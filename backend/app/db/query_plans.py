@@ -0,0 +1,211 @@
+"""
+Query-plan checks for the hot queries.
+
+Runs ``EXPLAIN`` on the statements behind profile reads, card search, skill
+lookup by name, limit counts and the auth user lookup, and fails when one of
+them scans a large table instead of using an index. A dropped index or an
+ORM change that defeats one then shows up here rather than as latency.
+
+    python -m app.db.query_plans                       # seeds a temporary SQLite database
+    python -m app.db.query_plans --database-url postgresql://localhost/quick_cards
+
+The same checks run as tests in ``tests/test_query_plans.py`` when
+``TEST_POSTGRES_URL`` is set.
+
+Exits non-zero if any check fails. On PostgreSQL sequential scans are
+disabled for the session, so a ``Seq Scan`` in the plan means no index could
+serve the query at all, independent of table size and statistics.
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, List
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.engine import Connection
+
+from app.db.models import User, Skill, user_skill
+from app.db.reads import (
+    RELATION_TABLES,
+    contacts_statement,
+    custom_links_statement,
+    projects_statement,
+    relation_count_statement,
+    skills_statement,
+    user_cards_statement,
+    user_statement,
+)
+
+logger = logging.getLogger(__name__)
+
+# Tables that grow with the number of users; skills is a catalog and may be scanned
+LARGE_TABLES = frozenset({"users", "contacts", "projects", "custom_links", "user_skill"})
+
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+
+@dataclass
+class PlanCheck:
+    name: str
+    build: Callable[[Dict], object]
+    # Large tables a dialect cannot avoid scanning for this query, e.g. infix
+    # LIKE on SQLite, which has no trigram indexes
+    allowed_scans: Dict[str, FrozenSet[str]] = field(default_factory=dict)
+
+
+@dataclass
+class PlanResult:
+    check: PlanCheck
+    plan: List[str]
+    scans: List[str]
+
+    @property
+    def ok(self) -> bool:
+        return not self.scans
+
+
+SEARCH_SCANS = {"sqlite": frozenset({"users"})}
+
+CHECKS = [
+    PlanCheck("auth user lookup", lambda s: select(User).where(User.id == s["user_id"])),
+    PlanCheck("profile: user", lambda s: user_statement(s["user_id"])),
+    PlanCheck("profile: public user", lambda s: user_statement(s["user_id"], public=True)),
+    PlanCheck("profile: contacts", lambda s: contacts_statement(s["user_id"])),
+    PlanCheck("profile: public contacts", lambda s: contacts_statement(s["user_id"], public=True)),
+    PlanCheck("profile: projects", lambda s: projects_statement(s["user_id"])),
+    PlanCheck("profile: skills", lambda s: skills_statement(s["user_id"])),
+    PlanCheck("profile: custom links", lambda s: custom_links_statement(s["user_id"])),
+    PlanCheck("skill lookup by name", lambda s: select(Skill).where(Skill.name == s["skill_name"])),
+    PlanCheck("skill holders", lambda s: select(user_skill.c.user_id).where(user_skill.c.skill_id == s["skill_id"])),
+    *(
+        PlanCheck(f"limit count: {relation}", lambda s, relation=relation: relation_count_statement(relation, s["user_id"]))
+        for relation in RELATION_TABLES
+    ),
+    PlanCheck("search by name", lambda s: user_cards_statement(q=s["name_fragment"]), SEARCH_SCANS),
+    PlanCheck("search by skill", lambda s: user_cards_statement(skill=s["skill_name"]), SEARCH_SCANS),
+    PlanCheck("search by project", lambda s: user_cards_statement(project=s["project_fragment"]), SEARCH_SCANS),
+]
+
+
+def sample_values(conn: Connection) -> Dict:
+    """Real ids and names to plug into the statements."""
+    row = conn.execute(
+        select(user_skill.c.user_id, Skill.id, Skill.name)
+        .join(Skill, Skill.id == user_skill.c.skill_id)
+        .limit(1)
+    ).first()
+    if row is None:
+        raise RuntimeError("The database has no users with skills; seed it first")
+    user = conn.execute(select(User.name).where(User.id == row.user_id)).first()
+    project = conn.execute(text("SELECT name FROM projects WHERE name IS NOT NULL LIMIT 1")).first()
+    return {
+        "user_id": row.user_id,
+        "skill_id": row.id,
+        "skill_name": row.name,
+        "name_fragment": (user.name or "a")[:4],
+        "project_fragment": (project.name if project else "a")[:4],
+    }
+
+
+def _compile(conn: Connection, statement):
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    return str(compiled), params
+
+
+def _postgresql_nodes(plan: Dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _postgresql_nodes(child)
+
+
+def explain(conn: Connection, check: PlanCheck, sample: Dict) -> PlanResult:
+    sql, params = _compile(conn, check.build(sample))
+    dialect = conn.dialect.name
+    allowed = check.allowed_scans.get(dialect, frozenset())
+    plan, scans = [], []
+
+    if dialect == "sqlite":
+        for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params):
+            detail = row[-1]
+            plan.append(detail)
+            match = _SQLITE_SCAN.match(detail)
+            if match and match.group(1) in LARGE_TABLES and match.group(1) not in allowed:
+                scans.append(detail)
+    elif dialect == "postgresql":
+        document = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}", params).scalar()
+        for node in _postgresql_nodes(document[0]["Plan"]):
+            relation = node.get("Relation Name")
+            plan.append(f"{node['Node Type']} {relation or ''} {node.get('Index Name', '')}".strip())
+            if relation not in LARGE_TABLES or relation in allowed:
+                continue
+            # A full index scan without a condition reads the whole table too
+            full_index_scan = node["Node Type"] in ("Index Scan", "Index Only Scan") and "Index Cond" not in node
+            if node["Node Type"] == "Seq Scan" or full_index_scan:
+                scans.append(f"{node['Node Type']} on {relation}")
+    else:
+        raise NotImplementedError(f"No plan checks for {dialect}")
+
+    return PlanResult(check, plan, scans)
+
+
+def check_plans(conn: Connection) -> List[PlanResult]:
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("SET enable_seqscan = off")
+    conn.exec_driver_sql("ANALYZE")
+    sample = sample_values(conn)
+    return [explain(conn, check, sample) for check in CHECKS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Seeded database to check (default: a temporary SQLite one)")
+    parser.add_argument("--users", type=int, default=5000, help="Users to seed the temporary database with")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan, not just failing ones")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+
+    tmpdir = None
+    url = args.database_url
+    if url is None:
+        from app.benchmarks.dataset import seed_database
+        from app.db.migrations import upgrade
+
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'plans.db')}"
+        seed_database(url, args.users)
+        upgrade_engine = create_engine(url)
+        upgrade(upgrade_engine)
+        upgrade_engine.dispose()
+
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            results = check_plans(conn)
+    finally:
+        engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    failed = [result for result in results if not result.ok]
+    for result in results:
+        print(f"{'ok  ' if result.ok else 'FAIL'} {result.check.name}")
+        if not result.ok:
+            print(f"       scans: {'; '.join(result.scans)}")
+        if args.verbose or not result.ok:
+            for line in result.plan:
+                print(f"       | {line}")
+
+    print(f"{len(results) - len(failed)}/{len(results)} query plans use indexes")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Per-request SQL statement accounting.
+
+Engine-level cursor events feed the ``QueryStats`` of the ``track_queries``
+block active in the current context (what the request middleware uses) and
+of every ``capture_queries`` block, which sees statements from all threads.
+The latter is what tests want, since TestClient runs the app in another
+thread:
+
+    with assert_query_count(2):
+        client.get("/v1/users/me", headers=headers)
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+_process_collectors: List["QueryStats"] = []
+
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists / VALUES tuples of bound parameters: (?, ?, ?) or (%(id_1)s, %(id_2)s)
+_PARAM_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|:\w+))+\s*\)")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so repeated executions with different ids compare equal."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    return _PARAM_LIST.sub("(?)", shape)
+
+
+class QueryStats:
+    __slots__ = ("count", "duration", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statement shapes executed at least ``threshold`` times: likely N+1 loops."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+@contextmanager
+def track_queries():
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def capture_queries():
+    """Collect every statement executed in this process while the block runs."""
+    stats = QueryStats()
+    _process_collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        _process_collectors.remove(stats)
+
+
+@contextmanager
+def assert_query_count(expected: int):
+    """Fail if the block doesn't issue exactly ``expected`` statements."""
+    with capture_queries() as stats:
+        yield stats
+    if stats.count != expected:
+        statements = "\n".join(f"  {count}x {shape}" for shape, count in stats.shapes.most_common())
+        raise AssertionError(f"Expected {expected} statements, got {stats.count}:\n{statements}")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None or _process_collectors:
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_times")
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    for collector in _process_collectors:
+        collector.record(statement, duration)
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_timer(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_times"):
+        conn.info["query_start_times"].pop()
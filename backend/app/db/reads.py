@@ -0,0 +1,582 @@
+"""
+Read-only data access that skips ORM hydration.
+
+Hot read paths select plain columns with Core ``select()`` and build compact
+``__slots__`` records straight from the result rows, so there is no identity
+map bookkeeping, no attribute instrumentation and no intermediate dicts.
+``serialize`` turns records into JSON-ready structures in one pass, replacing
+``jsonable_encoder``.
+
+The ``load_*`` functions take a session (handy for benchmarks and for reusing
+a session); the ``get_*`` wrappers open a read session themselves.
+"""
+from dataclasses import dataclass, fields
+from datetime import date, datetime
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import exists, func, select, true
+from sqlalchemy.exc import SQLAlchemyError
+import logging
+
+from app.db.models import PROFILE_SECTIONS, User, Contact, Project, Skill, CustomLink, user_skill
+from app.db.session import get_read_session
+
+logger = logging.getLogger(__name__)
+
+
+class Record:
+    """Base for read records; subclasses declare ``__slots__`` matching their fields."""
+    __slots__ = ()
+
+
+@dataclass
+class UserRecord(Record):
+    __slots__ = ("id", "username", "name", "created_at", "updated_at", "premium_tier", "premium_expires_at",
+                 "avatar_url", "background_type", "background_value", "description", "badge",
+                 "reffed_by", "referrals", "is_banned", "is_new")
+    id: int
+    username: Optional[str]
+    name: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    premium_tier: Optional[int]
+    premium_expires_at: Optional[datetime]
+    avatar_url: Optional[str]
+    background_type: Optional[str]
+    background_value: Optional[str]
+    description: Optional[str]
+    badge: Optional[str]
+    reffed_by: Optional[int]
+    referrals: Optional[int]
+    is_banned: Optional[bool]
+    is_new: Optional[bool]
+
+
+@dataclass
+class PublicUserRecord(Record):
+    """The part of a user that other people may see."""
+    __slots__ = ("id", "username", "name", "avatar_url", "background_type", "background_value",
+                 "description", "badge")
+    id: int
+    username: Optional[str]
+    name: Optional[str]
+    avatar_url: Optional[str]
+    background_type: Optional[str]
+    background_value: Optional[str]
+    description: Optional[str]
+    badge: Optional[str]
+
+
+@dataclass
+class ContactRecord(Record):
+    __slots__ = ("id", "user_id", "type", "value", "is_public")
+    id: int
+    user_id: int
+    type: Optional[str]
+    value: Optional[str]
+    is_public: Optional[bool]
+
+
+@dataclass
+class ProjectRecord(Record):
+    __slots__ = ("id", "user_id", "name", "description", "avatar_url", "role", "url")
+    id: int
+    user_id: int
+    name: Optional[str]
+    description: Optional[str]
+    avatar_url: Optional[str]
+    role: Optional[str]
+    url: Optional[str]
+
+
+@dataclass
+class SkillRecord(Record):
+    __slots__ = ("id", "name", "description", "image_url", "is_predefined")
+    id: int
+    name: Optional[str]
+    description: Optional[str]
+    image_url: Optional[str]
+    is_predefined: Optional[bool]
+
+
+@dataclass
+class CustomLinkRecord(Record):
+    __slots__ = ("id", "user_id", "title", "url")
+    id: int
+    user_id: int
+    title: Optional[str]
+    url: Optional[str]
+
+
+@dataclass
+class ProfileRecord(Record):
+    """
+    A user with its relations; serializes flat, like the /users endpoints always
+    returned it. ``version`` is the user's ``profile_version`` and isn't serialized.
+    Relations that weren't loaded are None and left out.
+    """
+    __slots__ = ("user", "contacts", "projects", "skills", "custom_links", "version")
+    user: Record
+    contacts: Optional[List[ContactRecord]]
+    projects: Optional[List[ProjectRecord]]
+    skills: Optional[List[SkillRecord]]
+    custom_links: Optional[List[CustomLinkRecord]]
+    version: Optional[int]
+
+
+class PartialRecord(Record):
+    """Only the user columns a sparse fieldset asked for."""
+    __slots__ = ("data",)
+
+    def __init__(self, data: Dict[str, object]):
+        self.data = data
+
+
+def card_id(card: Record) -> int:
+    return card.data["id"] if isinstance(card, PartialRecord) else card.id
+
+
+def _columns(model, record_class):
+    # Select columns in field order so rows map positionally onto the record
+    table = model.__table__
+    return [table.c[field.name] for field in fields(record_class)]
+
+
+USER_COLUMNS = _columns(User, UserRecord)
+PUBLIC_USER_COLUMNS = _columns(User, PublicUserRecord)
+CONTACT_COLUMNS = _columns(Contact, ContactRecord)
+PROJECT_COLUMNS = _columns(Project, ProjectRecord)
+SKILL_COLUMNS = _columns(Skill, SkillRecord)
+CUSTOM_LINK_COLUMNS = _columns(CustomLink, CustomLinkRecord)
+
+# Tables holding each relation, keyed by user_id
+RELATION_TABLES = {
+    "contacts": Contact.__table__,
+    "projects": Project.__table__,
+    "skills": user_skill,
+    "custom_links": CustomLink.__table__,
+}
+
+
+RELATIONS = tuple(RELATION_TABLES)
+RELATION_RECORDS = {
+    "contacts": ContactRecord,
+    "projects": ProjectRecord,
+    "skills": SkillRecord,
+    "custom_links": CustomLinkRecord,
+}
+
+
+@dataclass(frozen=True)
+class Fieldset:
+    """
+    What a response needs: user ``columns`` (None means the full record) and
+    the ``relations`` to load. Built from ``fields=`` / ``include=`` by
+    ``parse_fieldset``.
+    """
+    columns: Optional[Tuple[str, ...]]
+    relations: FrozenSet[str]
+
+    @property
+    def key(self) -> str:
+        columns = ",".join(self.columns) if self.columns is not None else "*"
+        return f"{columns};{','.join(sorted(self.relations))}"
+
+
+def _names(value: Optional[str]) -> List[str]:
+    return [name.strip() for name in value.split(",") if name.strip()] if value else []
+
+
+def parse_fieldset(field_names: Optional[str], include: Optional[str], public: bool,
+                   default_relations: Iterable[str] = RELATIONS) -> Optional[Fieldset]:
+    """
+    Parse ``fields=`` (user columns, may also name relations) and ``include=``
+    (relations). Returns None when neither is given, meaning the default
+    representation. Raises ValueError on unknown names.
+    """
+    if field_names is None and include is None:
+        return None
+
+    allowed = {field.name for field in fields(PublicUserRecord if public else UserRecord)}
+    columns = None
+    relations = set() if field_names is not None else set(default_relations)
+
+    if field_names is not None:
+        # The id is always returned, cards are keyed by it
+        columns = ["id"]
+        for name in _names(field_names):
+            if name in RELATION_TABLES:
+                relations.add(name)
+            elif name in allowed:
+                if name not in columns:
+                    columns.append(name)
+            else:
+                raise ValueError(f"Unknown field: {name}")
+
+    if include is not None:
+        relations = relations if field_names is not None else set()
+        for name in _names(include):
+            if name not in RELATION_TABLES:
+                raise ValueError(f"Unknown relation: {name}")
+            relations.add(name)
+
+    return Fieldset(tuple(columns) if columns is not None else None, frozenset(relations))
+
+
+def _records(session, record_class, statement) -> list:
+    return [record_class(*row) for row in session.execute(statement)]
+
+
+def user_statement(user_id, public: bool = False):
+    return select(*(PUBLIC_USER_COLUMNS if public else USER_COLUMNS)).where(User.id == user_id)
+
+
+def contacts_statement(user_id, public: bool = False):
+    statement = select(*CONTACT_COLUMNS).where(Contact.user_id == user_id)
+    if public:
+        statement = statement.where(Contact.is_public == true())
+    return statement.order_by(Contact.id)
+
+
+def projects_statement(user_id):
+    return select(*PROJECT_COLUMNS).where(Project.user_id == user_id).order_by(Project.id)
+
+
+def skills_statement(user_id):
+    return (
+        select(*SKILL_COLUMNS)
+        .join(user_skill, user_skill.c.skill_id == Skill.id)
+        .where(user_skill.c.user_id == user_id)
+        .order_by(Skill.id)
+    )
+
+
+def custom_links_statement(user_id):
+    return select(*CUSTOM_LINK_COLUMNS).where(CustomLink.user_id == user_id).order_by(CustomLink.id)
+
+
+def _grouped(session, record_class, statement, user_ids) -> Dict[int, list]:
+    # Every row starts with the owning user id, followed by the record's columns
+    grouped = {user_id: [] for user_id in user_ids}
+    for row in session.execute(statement):
+        grouped[row[0]].append(record_class(*row[1:]))
+    return grouped
+
+
+def relations_statement(relation: str, user_ids: List[int], public: bool = False):
+    """One relation of many users; each row is the owner's id followed by the record's columns."""
+    if relation == "contacts":
+        statement = select(Contact.user_id, *CONTACT_COLUMNS).where(Contact.user_id.in_(user_ids))
+        if public:
+            statement = statement.where(Contact.is_public == true())
+        return statement.order_by(Contact.user_id, Contact.id)
+    if relation == "projects":
+        return (
+            select(Project.user_id, *PROJECT_COLUMNS)
+            .where(Project.user_id.in_(user_ids))
+            .order_by(Project.user_id, Project.id)
+        )
+    if relation == "skills":
+        return (
+            select(user_skill.c.user_id, *SKILL_COLUMNS)
+            .join(user_skill, user_skill.c.skill_id == Skill.id)
+            .where(user_skill.c.user_id.in_(user_ids))
+            .order_by(user_skill.c.user_id, Skill.id)
+        )
+    if relation == "custom_links":
+        return (
+            select(CustomLink.user_id, *CUSTOM_LINK_COLUMNS)
+            .where(CustomLink.user_id.in_(user_ids))
+            .order_by(CustomLink.user_id, CustomLink.id)
+        )
+    raise ValueError(f"Unknown relation: {relation}")
+
+
+def load_relations(session, user_ids: Iterable[int], public: bool = False,
+                   relations: Iterable[str] = RELATIONS) -> Dict[int, ProfileRecord]:
+    """
+    Load the relations of many users with one ``IN`` query per relation.
+
+    Returns profiles keyed by user id with ``user`` left as ``None``, so callers
+    that already hold the user rows (streams, batches) can fill it in.
+    Relations not asked for stay ``None`` and are left out when serialized.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+
+    loaded = {
+        relation: _grouped(session, RELATION_RECORDS[relation],
+                           relations_statement(relation, user_ids, public), user_ids)
+        for relation in relations
+    }
+    return {
+        user_id: ProfileRecord(
+            user=None,
+            contacts=loaded["contacts"][user_id] if "contacts" in loaded else None,
+            projects=loaded["projects"][user_id] if "projects" in loaded else None,
+            skills=loaded["skills"][user_id] if "skills" in loaded else None,
+            custom_links=loaded["custom_links"][user_id] if "custom_links" in loaded else None,
+            version=None,
+        )
+        for user_id in user_ids
+    }
+
+
+def load_user(session, user_id, public: bool = False) -> Optional[Record]:
+    row = session.execute(user_statement(user_id, public)).first()
+    if row is None:
+        return None
+    return (PublicUserRecord if public else UserRecord)(*row)
+
+
+def load_profile(session, user_id, public: bool = False,
+                 fieldset: Fieldset = None) -> Optional[ProfileRecord]:
+    """
+    Load a user and their relations; public profiles hide private contacts.
+    With a ``fieldset`` only its columns are selected and only its relations queried.
+    """
+    columns = fieldset.columns if fieldset else None
+    if columns is None:
+        statement = user_statement(user_id, public)
+    else:
+        statement = select(*(User.__table__.c[name] for name in columns)).where(User.id == user_id)
+    row = session.execute(statement.add_columns(User.profile_version)).first()
+    if row is None:
+        return None
+
+    if columns is None:
+        user = (PublicUserRecord if public else UserRecord)(*row[:-1])
+    else:
+        user = PartialRecord(dict(zip(columns, row[:-1])))
+    relations = fieldset.relations if fieldset else RELATIONS
+
+    def load(relation, record_class, statement):
+        return _records(session, record_class, statement) if relation in relations else None
+
+    return ProfileRecord(
+        user=user,
+        version=row[-1],
+        contacts=load("contacts", ContactRecord, contacts_statement(user_id, public)),
+        projects=load("projects", ProjectRecord, projects_statement(user_id)),
+        skills=load("skills", SkillRecord, skills_statement(user_id)),
+        custom_links=load("custom_links", CustomLinkRecord, custom_links_statement(user_id)),
+    )
+
+
+def load_profiles(session, user_ids: Iterable[int], public: bool = True,
+                  fieldset: Fieldset = None) -> Dict[int, ProfileRecord]:
+    """
+    Load many profiles at once: one ``IN`` query for the users and one per
+    relation. Unknown ids are simply absent from the result.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return {}
+
+    columns = fieldset.columns if fieldset else None
+    if columns is None:
+        record_class = PublicUserRecord if public else UserRecord
+        statement = select(*(PUBLIC_USER_COLUMNS if public else USER_COLUMNS))
+    else:
+        statement = select(*(User.__table__.c[name] for name in columns))
+    rows = session.execute(statement.add_columns(User.profile_version).where(User.id.in_(user_ids))).all()
+
+    users = {}
+    for row in rows:
+        user = record_class(*row[:-1]) if columns is None else PartialRecord(dict(zip(columns, row[:-1])))
+        users[card_id(user)] = (user, row[-1])
+
+    relations = fieldset.relations if fieldset else RELATIONS
+    profiles = load_relations(session, users, public, relations)
+    for user_id, (user, version) in users.items():
+        profiles[user_id].user = user
+        profiles[user_id].version = version
+    return profiles
+
+
+def user_cards_statement(q: str = None, skill: str = None, project: str = None,
+                         limit: int = 10, offset: int = 0, columns: Sequence[str] = None):
+    if columns is None:
+        statement = select(*PUBLIC_USER_COLUMNS)
+    else:
+        statement = select(*(User.__table__.c[name] for name in columns))
+
+    if q:
+        statement = statement.where(User.name.ilike(f"%{q}%") | User.username.ilike(f"%{q}%"))
+    # EXISTS rather than joins: a user matching through several skills or projects is still one card
+    if skill:
+        statement = statement.where(exists().where(
+            user_skill.c.user_id == User.id,
+            Skill.id == user_skill.c.skill_id,
+            Skill.name.ilike(f"%{skill}%")
+        ))
+    if project:
+        statement = statement.where(exists().where(
+            Project.user_id == User.id,
+            Project.name.ilike(f"%{project}%")
+        ))
+
+    return statement.offset(offset).limit(limit)
+
+
+def relation_count_statement(relation: str, user_id):
+    """How many rows of a relation a user has, for limit checks."""
+    table = RELATION_TABLES[relation]
+    return select(func.count()).select_from(table).where(table.c.user_id == user_id)
+
+
+def load_user_cards(session, q: str = None, skill: str = None, project: str = None,
+                    limit: int = 10, offset: int = 0, fieldset: Fieldset = None) -> List[Record]:
+    """
+    Public cards matching the filters. Relations are only loaded when the
+    ``fieldset`` asks for them, with one ``IN`` query per relation for the page.
+    """
+    columns = fieldset.columns if fieldset else None
+    statement = user_cards_statement(q, skill, project, limit, offset, columns)
+    if columns is None:
+        cards = _records(session, PublicUserRecord, statement)
+    else:
+        cards = [PartialRecord(dict(zip(columns, row))) for row in session.execute(statement)]
+
+    if not fieldset or not fieldset.relations:
+        return cards
+
+    profiles = load_relations(session, [card_id(card) for card in cards], public=True,
+                              relations=fieldset.relations)
+    for card in cards:
+        profiles[card_id(card)].user = card
+    return [profiles[card_id(card)] for card in cards]
+
+
+def count_relation(session, relation: str, user_id) -> int:
+    return session.execute(relation_count_statement(relation, user_id)).scalar()
+
+
+def load_profile_changes(session, user_id, since: int) -> Optional[ProfileRecord]:
+    """
+    The owner's card reduced to the sections changed after version ``since``:
+    ``user`` and relations that didn't change are None. Everything counts as
+    changed when ``since`` is ahead of the stored version (e.g. a restored
+    database), so the client resyncs instead of trusting a version we never issued.
+    """
+    section_columns = [User.__table__.c[f"{section}_version"] for section in PROFILE_SECTIONS]
+    row = session.execute(select(User.profile_version, *section_columns).where(User.id == user_id)).first()
+    if row is None:
+        return None
+
+    version = row[0]
+    if since > version:
+        changed = set(PROFILE_SECTIONS)
+    else:
+        changed = {section for section, changed_at in zip(PROFILE_SECTIONS, row[1:]) if changed_at > since}
+
+    def load(relation, record_class, statement):
+        return _records(session, record_class, statement) if relation in changed else None
+
+    return ProfileRecord(
+        user=load_user(session, user_id) if "user" in changed else None,
+        version=version,
+        contacts=load("contacts", ContactRecord, contacts_statement(user_id)),
+        projects=load("projects", ProjectRecord, projects_statement(user_id)),
+        skills=load("skills", SkillRecord, skills_statement(user_id)),
+        custom_links=load("custom_links", CustomLinkRecord, custom_links_statement(user_id)),
+    )
+
+
+def get_profile_changes(user_id, since: int) -> Optional[ProfileRecord]:
+    try:
+        with get_read_session(user_id) as session:
+            return load_profile_changes(session, user_id, since)
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while retrieving profile changes {user_id}: {str(e)}")
+        raise
+
+
+def version_statement(user_id):
+    return select(User.profile_version).where(User.id == user_id)
+
+
+def get_relation_count(relation: str, user_id) -> int:
+    try:
+        with get_read_session(user_id) as session:
+            return count_relation(session, relation, user_id)
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while counting {relation} of {user_id}: {str(e)}")
+        raise
+
+
+def get_profile_version(user_id) -> Optional[int]:
+    """The user's ``profile_version``, or None if there is no such user. One primary key lookup."""
+    try:
+        with get_read_session(user_id) as session:
+            return session.execute(version_statement(user_id)).scalar()
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while retrieving profile version {user_id}: {str(e)}")
+        raise
+
+
+def get_profile(user_id, public: bool = False, fieldset: Fieldset = None) -> Optional[ProfileRecord]:
+    try:
+        with get_read_session(user_id) as session:
+            return load_profile(session, user_id, public, fieldset)
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while retrieving profile {user_id}: {str(e)}")
+        raise
+
+
+def get_profiles(user_ids: Iterable[int], public: bool = True,
+                 fieldset: Fieldset = None) -> Dict[int, ProfileRecord]:
+    try:
+        with get_read_session() as session:
+            return load_profiles(session, user_ids, public, fieldset)
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while retrieving profiles: {str(e)}")
+        raise
+
+
+def search_user_cards(q: str = None, skill: str = None, project: str = None,
+                      limit: int = 10, offset: int = 0, fieldset: Fieldset = None) -> List[Record]:
+    try:
+        with get_read_session() as session:
+            return load_user_cards(session, q, skill, project, limit, offset, fieldset)
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while searching users: {str(e)}")
+        raise
+
+
+def serialize(value):
+    """Convert records (and lists of them) to JSON-ready dicts and lists in a single pass."""
+    if isinstance(value, ProfileRecord):
+        data = serialize(value.user)
+        for relation in RELATIONS:
+            items = getattr(value, relation)
+            if items is not None:
+                data[relation] = [serialize(item) for item in items]
+        return data
+    if isinstance(value, PartialRecord):
+        return {
+            name: item.isoformat() if isinstance(item, (datetime, date)) else item
+            for name, item in value.data.items()
+        }
+    if isinstance(value, Record):
+        data = {}
+        for name in value.__slots__:
+            item = getattr(value, name)
+            data[name] = item.isoformat() if isinstance(item, (datetime, date)) else item
+        return data
+    if isinstance(value, list):
+        return [serialize(item) for item in value]
+    return value
+
+
+def serialize_changes(profile: ProfileRecord) -> dict:
+    """Delta sync payload: the new version plus only the sections that were loaded."""
+    data = {"version": profile.version}
+    if profile.user is not None:
+        data["user"] = serialize(profile.user)
+    for relation in RELATIONS:
+        items = getattr(profile, relation)
+        if items is not None:
+            data[relation] = serialize(items)
+    return data
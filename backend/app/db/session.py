@@ -1,18 +1,48 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, scoped_session
 import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
 from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
 
 
 from app.core.config import settings
+from app.db.models import PROFILE_SECTIONS, User
+from app.db.pool import engine_options, instrument_engine
 
 logger = logging.getLogger(__name__)
 
+# Optional read replica. Without it every read goes to the primary.
+REPLICA_DATABASE_URL = getattr(settings, "REPLICA_DATABASE_URL", None)
+# How long reads about a user stay on the primary after that user wrote something
+READ_YOUR_WRITES_SECONDS = getattr(settings, "READ_YOUR_WRITES_SECONDS", 5.0)
 
-engine = create_engine(settings.DATABASE_URL)
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+instrument_engine(engine, "primary")
 SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 SessionLocal = scoped_session(SessionFactory)
 
+replica_engine = None
+if REPLICA_DATABASE_URL:
+    replica_engine = create_engine(REPLICA_DATABASE_URL, **engine_options(REPLICA_DATABASE_URL))
+    instrument_engine(replica_engine, "replica")
+ReplicaSessionFactory = (
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine) if replica_engine else None
+)
+
+# User the current request acts on behalf of, set by the auth dependency
+_routing_user: ContextVar[Optional[str]] = ContextVar("routing_user", default=None)
+# Reads in a context that just committed a write stay on the primary for a while
+_primary_pinned_until: ContextVar[float] = ContextVar("primary_pinned_until", default=0.0)
+
+_recent_writers: "OrderedDict[str, float]" = OrderedDict()
+_recent_writers_lock = threading.Lock()
+
+
 @contextmanager
 def get_db_session():
     session = SessionLocal()
@@ -27,6 +57,153 @@ def get_db_session():
         session.close()
 
 
+@contextmanager
+def get_read_session(user_id=None):
+    """
+    Session for read-only work, served by the replica when one is configured.
+
+    Reads fall back to the primary while the replica may not have caught up
+    with writes the caller depends on: writes committed earlier in the same
+    request/thread, and recent writes by ``user_id`` (or by the authenticated
+    user when not given). The session is never committed.
+    """
+    factory = ReplicaSessionFactory if _use_replica(user_id) else SessionFactory
+    session = factory()
+    try:
+        yield session
+    except Exception as e:
+        logger.error(f"[DB] Error in read session: {e}", exc_info=True)
+        raise
+    finally:
+        session.rollback()
+        session.close()
+
+
+def set_routing_user(user_id):
+    _routing_user.set(str(user_id) if user_id is not None else None)
+
+
+def mark_user_written(session, user_id, section: Optional[str] = None):
+    """
+    Record a write to ``user_id``'s data made with Core statements the ORM
+    can't see. ``section`` is the profile section it changed (``PROFILE_SECTIONS``).
+    """
+    session.info.setdefault("written_user_ids", set()).add(str(user_id))
+    if section is not None:
+        session.info.setdefault("written_sections", {}).setdefault(str(user_id), set()).add(section)
+
+
+def recently_written(user_id) -> bool:
+    written_at = _recent_writers.get(str(user_id))
+    return written_at is not None and time.monotonic() - written_at < READ_YOUR_WRITES_SECONDS
+
+
+def _use_replica(user_id) -> bool:
+    if ReplicaSessionFactory is None:
+        return False
+    if time.monotonic() < _primary_pinned_until.get():
+        return False
+
+    user_id = user_id if user_id is not None else _routing_user.get()
+    return user_id is None or not recently_written(user_id)
+
+
+def _remember_writers(user_ids):
+    now = time.monotonic()
+    with _recent_writers_lock:
+        for user_id in user_ids:
+            _recent_writers[user_id] = now
+            _recent_writers.move_to_end(user_id)
+
+        while _recent_writers:
+            oldest_user, written_at = next(iter(_recent_writers.items()))
+            if now - written_at < READ_YOUR_WRITES_SECONDS:
+                break
+            del _recent_writers[oldest_user]
+
+
+# Profile section each mapped table belongs to
+_SECTION_BY_TABLE = {
+    "users": "user",
+    "contacts": "contacts",
+    "projects": "projects",
+    "custom_links": "custom_links",
+}
+
+
+def _owner_id(instance):
+    # Users own themselves; contacts, projects and links point at their owner
+    if hasattr(instance, "user_id"):
+        return instance.user_id
+    if instance.__tablename__ == "users":
+        return instance.id
+    return None
+
+
+@event.listens_for(SessionFactory, "after_flush")
+def _collect_written_users(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        owner_id = _owner_id(instance)
+        if owner_id is None:
+            continue
+        if isinstance(instance, User) and instance in session.new:
+            # A new card starts with every section at its first version
+            for section in PROFILE_SECTIONS:
+                mark_user_written(session, owner_id, section)
+        else:
+            mark_user_written(session, owner_id, _SECTION_BY_TABLE.get(instance.__tablename__))
+    session.info["has_writes"] = True
+
+
+@event.listens_for(SessionFactory, "do_orm_execute")
+def _collect_statement_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["has_writes"] = True
+
+
+@event.listens_for(SessionFactory, "before_commit")
+def _bump_profile_versions(session):
+    # Flush first so writes still pending in the session are collected too
+    session.flush()
+    written = session.info.get("written_user_ids")
+    if not written:
+        return
+
+    # One UPDATE per distinct set of changed sections, usually just one. SET
+    # expressions see the old row, so every changed section gets the new version.
+    sections = session.info.get("written_sections", {})
+    groups = defaultdict(list)
+    for user_id in written:
+        groups[frozenset(sections.get(user_id, ()))].append(int(user_id))
+
+    users = User.__table__
+    new_version = users.c.profile_version + 1
+    for changed, user_ids in groups.items():
+        values = {"profile_version": new_version}
+        values.update({f"{section}_version": new_version for section in changed})
+        session.execute(users.update().where(users.c.id.in_(user_ids)).values(**values))
+
+
+@event.listens_for(SessionFactory, "after_commit")
+def _track_committed_writes(session):
+    written = session.info.pop("written_user_ids", set())
+    session.info.pop("written_sections", None)
+    if not session.info.pop("has_writes", False) and not written:
+        return
+
+    routing_user = _routing_user.get()
+    if routing_user is not None:
+        written.add(routing_user)
+    _remember_writers(written)
+    _primary_pinned_until.set(time.monotonic() + READ_YOUR_WRITES_SECONDS)
+
+
+@event.listens_for(SessionFactory, "after_rollback")
+def _forget_rolled_back_writes(session):
+    session.info.pop("written_user_ids", None)
+    session.info.pop("written_sections", None)
+    session.info.pop("has_writes", None)
+
 # def init_db():
 #     """Initialize database tables and data"""
 #     logger.info("Starting database initialization...")
@@ -1,14 +1,23 @@
 from fastapi import FastAPI, Depends, HTTPException, Request, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 import os
 import threading
 import uvicorn
+from contextlib import asynccontextmanager
 from sqlalchemy import inspect
 
 from app.core.config import settings
-from app.db.session import engine
+from app.core.metrics import render_metrics
+from app.core.serialization import JSONResponse
+from app.db.session import engine, replica_engine
+from app.db.pool import warm_up_pool
+from app.middleware.query_budget import QueryBudgetMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.load_shedding import LoadSheddingMiddleware
+from app.middleware.deadlines import DeadlineMiddleware
+from app.middleware.loop_monitor import LoopMonitorMiddleware
 from app.db.functions import get_db_session
 
 # Set up logging
@@ -18,7 +27,52 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+def prepare_database():
+    """Create the schema, apply migrations and open the pool connections."""
+    try:
+        logger.info("Starting database initialization...")
+        from app.db.init_db import init_db
+
+        # Initialize database
+        success = init_db()
+
+        if success:
+            logger.info("Database initialization completed successfully")
+        else:
+            logger.error("Database initialization failed - check logs for details")
+
+    except Exception as e:
+        logger.error(f"Error during database initialization: {e}", exc_info=True)
+
+    # Open pool connections before the first requests arrive
+    try:
+        for pool_engine in (engine, replica_engine):
+            if pool_engine is not None:
+                warm_up_pool(pool_engine)
+    except Exception as e:
+        logger.error(f"Error while warming up the connection pool: {e}", exc_info=True)
+
+
+# Done at startup rather than import, so processes that only import the app
+# (image pool workers, scripts) don't touch the database
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    prepare_database()
+    yield
+
+
+app = FastAPI(default_response_class=JSONResponse, lifespan=lifespan)
+
+# Per-route latency budgets carried into SQL statement timeouts; 504 when one runs out
+app.add_middleware(DeadlineMiddleware)
+
+# Shed low-priority work with 503s once the adaptive concurrency limit is reached
+app.add_middleware(LoadSheddingMiddleware)
+
+# Throttle uploads and search per user/IP. Added before CORS so CORS wraps both and
+# the mini-app can read 429 and 503 responses
+app.add_middleware(RateLimitMiddleware)
 
 # Configure CORS
 app.add_middleware(
@@ -27,8 +81,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Read by the mini-app for conditional requests, delta sync and backing off
+    expose_headers=["ETag", "X-Profile-Version", "Retry-After"],
 )
 
+# Count SQL statements per request and flag N+1 patterns
+app.add_middleware(QueryBudgetMiddleware)
+
+# Measure event-loop lag and log the stack of whatever blocks it
+app.add_middleware(LoopMonitorMiddleware)
+
 # Database dependency
 # def get_db():
 #     db = SessionLocal()
@@ -47,27 +109,15 @@ from app.api.routes import register_routes
 # Register API routes
 register_routes(app)
 
-# Initialize the database
-try:
-    logger.info("Starting database initialization...")
-    from app.db.init_db import init_db
-    
-    # Initialize database
-    success = init_db()
-    
-    if success:
-        logger.info("Database initialization completed successfully")
-    else:
-        logger.error("Database initialization failed - check logs for details")
-        
-except Exception as e:
-    logger.error(f"Error during database initialization: {e}", exc_info=True)
-
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/debug/routes")
 async def debug_routes():
     """Debug endpoint to list all registered routes"""
@@ -1,3 +1,3 @@
-from app.middleware.telegram_auth import AuthContext, get_auth_context, check_context
+from app.middleware.telegram_auth import AuthContext, get_auth_context, check_context, premium_tier
 
-__all__ = ["AuthContext", "get_auth_context", "check_context"]
+__all__ = ["AuthContext", "get_auth_context", "check_context", "premium_tier"]
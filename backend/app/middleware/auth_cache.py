@@ -0,0 +1,138 @@
+"""
+Caches that let most authenticated requests skip JWT verification and the
+user lookup, and returning users sign in without touching the database.
+
+Verified token claims are cached by digest until their ``exp``. User existence,
+ban status and entitlement version are cached per user and dropped as soon as
+this process commits a change to that user (creation, ban, deletion, any update); the TTL bounds how
+long other workers may serve a stale entry. Unknown users are cached only
+briefly, since they usually register right after their first request.
+Sign-in results (the user row ``/v1/auth/init`` answers with) follow the same
+rules as user status.
+"""
+import hashlib
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+from jose import jwt
+from sqlalchemy import event, select
+
+from app.core.config import settings
+from app.core.metrics import counter
+from app.core.ttl_cache import TTLCache
+from app.db.models import User
+from app.db.session import SessionFactory, get_db_session
+
+TOKEN_CACHE_SIZE = getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 10000)
+USER_CACHE_SIZE = getattr(settings, "AUTH_USER_CACHE_SIZE", 10000)
+USER_CACHE_TTL = getattr(settings, "AUTH_USER_CACHE_TTL", 300)
+NEGATIVE_USER_CACHE_TTL = getattr(settings, "AUTH_NEGATIVE_USER_CACHE_TTL", 5)
+
+cache_lookups = counter("auth_cache_lookups_total", "Auth cache lookups", ["cache", "result"])
+
+
+class UserStatus(NamedTuple):
+    exists: bool
+    is_banned: bool
+    entitlement_version: int = 0
+
+
+_tokens = TTLCache(TOKEN_CACHE_SIZE)
+_users = TTLCache(USER_CACHE_SIZE)
+_logins = TTLCache(USER_CACHE_SIZE)
+
+
+def token_claims(token: str, secret_key: str, algorithm: str) -> dict:
+    """
+    The claims of a valid token. Verification results are cached until the
+    token expires; invalid tokens raise ``JWTError`` and are not cached.
+    """
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    claims = _tokens.get(key)
+    if claims is not None:
+        cache_lookups.inc(cache="token", result="hit")
+        return dict(claims)
+    cache_lookups.inc(cache="token", result="miss")
+
+    claims = jwt.decode(token, secret_key, algorithms=[algorithm])
+    expires_at = claims.get("exp")
+    if claims.get("sub") and isinstance(expires_at, (int, float)):
+        _tokens.set(key, dict(claims), float(expires_at))
+    return claims
+
+
+def _load_user_status(user_id) -> UserStatus:
+    with get_db_session() as session:
+        row = session.execute(
+            select(User.is_banned, User.entitlement_version).where(User.id == user_id)
+        ).first()
+    if row is None:
+        return UserStatus(exists=False, is_banned=False)
+    return UserStatus(exists=True, is_banned=bool(row.is_banned), entitlement_version=row.entitlement_version)
+
+
+def user_status(user_id, load: Callable[[Any], UserStatus] = _load_user_status) -> UserStatus:
+    key = str(user_id)
+    status = _users.get(key)
+    if status is not None:
+        cache_lookups.inc(cache="user", result="hit")
+        return status
+    cache_lookups.inc(cache="user", result="miss")
+
+    status = load(user_id)
+    ttl = USER_CACHE_TTL if status.exists else NEGATIVE_USER_CACHE_TTL
+    _users.set(key, status, time.time() + ttl)
+    return status
+
+
+def cached_login(user_id) -> Optional[dict]:
+    user = _logins.get(str(user_id))
+    cache_lookups.inc(cache="login", result="miss" if user is None else "hit")
+    return dict(user) if user is not None else None
+
+
+def remember_login(user_id, user: dict):
+    """Cache a signed-in user's row; also settles their status for the requests that follow."""
+    key = str(user_id)
+    expires_at = time.time() + USER_CACHE_TTL
+    _logins.set(key, dict(user), expires_at)
+    status = UserStatus(exists=True, is_banned=bool(user.get("is_banned")),
+                        entitlement_version=user.get("entitlement_version", 0))
+    _users.set(key, status, expires_at)
+
+
+def invalidate_user(user_id):
+    _users.pop(str(user_id))
+    _logins.pop(str(user_id))
+
+
+def clear():
+    _tokens.clear()
+    _users.clear()
+    _logins.clear()
+
+
+@event.listens_for(SessionFactory, "after_flush")
+def _collect_changed_users(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, User) and instance.id is not None:
+            session.info.setdefault("auth_changed_user_ids", set()).add(str(instance.id))
+
+
+@event.listens_for(SessionFactory, "before_commit")
+def _collect_core_user_writes(session):
+    # Users rows written with Core statements, reported through mark_user_written
+    for user_id, sections in session.info.get("written_sections", {}).items():
+        if "user" in sections:
+            session.info.setdefault("auth_changed_user_ids", set()).add(user_id)
+
+
+@event.listens_for(SessionFactory, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("auth_changed_user_ids", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(SessionFactory, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop("auth_changed_user_ids", None)
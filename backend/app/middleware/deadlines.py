@@ -0,0 +1,156 @@
+"""
+Per-route latency budgets, enforced down to the database.
+
+Each request runs under a ``Deadline`` (see ``app.db.deadlines``) of its
+route's budget, so its SQL statements are cut off once the budget is spent.
+When that happens, or the handler is still running at the deadline, the
+client gets a ``504`` instead of whatever the handler made of the error.
+
+The endpoints run their queries on the event loop, so this middleware only
+gets to act when the handler awaits something: a blocking statement ends at
+its own timeout (close to the deadline), and the 504 follows. A client
+disconnect is noticed at the next await; the deadline is then expired and the
+handler cancelled, so no further statements are sent for it.
+
+Budgets are in seconds; ``None`` leaves a route unbounded (streamed exports,
+debug endpoints).
+"""
+import asyncio
+import logging
+import re
+from typing import List, Optional, Pattern, Tuple
+
+from app.core.config import settings
+from app.core.metrics import counter
+from app.core.serialization import dumps
+from app.db.deadlines import deadline
+from app.middleware.query_budget import route_label
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DEADLINE = getattr(settings, "REQUEST_DEADLINE", 10.0)
+SEARCH_DEADLINE = getattr(settings, "SEARCH_DEADLINE", 3.0)
+UPLOAD_DEADLINE = getattr(settings, "UPLOAD_DEADLINE", 30.0)
+
+deadline_exceeded = counter("request_deadline_exceeded_total", "Requests answered with 504 at their deadline", ["route"])
+requests_abandoned = counter("requests_abandoned_total", "Requests cancelled after the client disconnected", ["route"])
+
+# (method or None for any, path pattern, budget); the first match applies
+DEADLINE_RULES: List[Tuple[Optional[str], Pattern, Optional[float]]] = [
+    ("GET", re.compile(r"^/v1/users$"), SEARCH_DEADLINE),
+    ("GET", re.compile(r"^/v1/skills$"), SEARCH_DEADLINE),
+    ("POST", re.compile(r"^/v1/users/batch$"), SEARCH_DEADLINE),
+    ("POST", re.compile(r"^/v1/users/me/(avatar|story)$"), UPLOAD_DEADLINE),
+    ("POST", re.compile(r"^/v1/skills/upload-image$"), UPLOAD_DEADLINE),
+    ("GET", re.compile(r"^/v1/admin/export$"), None),
+    (None, re.compile(r"^/debug/"), None),
+]
+
+
+def budget_for(scope) -> Optional[float]:
+    for method, pattern, budget in DEADLINE_RULES:
+        if (method is None or scope["method"] == method) and pattern.match(scope["path"]):
+            return budget
+    return REQUEST_DEADLINE
+
+
+class DeadlineMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        budget = budget_for(scope) if scope["type"] == "http" else None
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+
+        with deadline(budget) as current:
+            await self._handle(scope, receive, send, current, budget)
+
+    async def _handle(self, scope, receive, send, current, budget):
+        response_started = False
+        response_complete = False
+        replaced = False
+        disconnected = False
+        messages: asyncio.Queue = asyncio.Queue()
+
+        async def send_checked(message):
+            nonlocal response_started, response_complete, replaced
+            if replaced:
+                return
+            if message["type"] == "http.response.start" and current.exceeded:
+                # The handler answered a timed-out query with an error of its own
+                replaced = True
+                await self._timeout(scope, send)
+                return
+            response_started = True
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                response_complete = True
+            await send(message)
+
+        async def receive_buffered():
+            if disconnected:
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        # The server's receive is only read here, so a disconnect is seen even
+        # while the handler never asks for the body
+        async def listen():
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    disconnected = True
+                    # Servers also report a disconnect once the response is sent;
+                    # background tasks may still be running then
+                    if response_complete:
+                        return
+                    current.expire()
+                    handler.cancel()
+                    return
+
+        handler = asyncio.ensure_future(self.app(scope, receive_buffered, send_checked))
+        listener = asyncio.ensure_future(listen())
+        try:
+            done, _ = await asyncio.wait({handler}, timeout=budget)
+            if not done:
+                current.expire()
+                current.exceeded = True
+                handler.cancel()
+                await asyncio.wait({handler})
+                if not response_started and not replaced:
+                    await self._timeout(scope, send)
+                return
+
+            if handler.cancelled():
+                if disconnected:
+                    requests_abandoned.inc(route=route_label(scope))
+                    return
+                raise asyncio.CancelledError()
+
+            error = handler.exception()
+            if error is not None:
+                if current.exceeded and not response_started and not replaced:
+                    await self._timeout(scope, send)
+                    return
+                raise error
+        finally:
+            listener.cancel()
+            if not handler.done():
+                handler.cancel()
+
+    async def _timeout(self, scope, send):
+        route = route_label(scope)
+        deadline_exceeded.inc(route=route)
+        logger.warning(f"{scope['method']} {scope['path']} ran past its deadline")
+        body = dumps({"error": "Request timed out"})
+        await send({
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
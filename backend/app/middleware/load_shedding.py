@@ -0,0 +1,154 @@
+"""
+Adaptive concurrency limit with load shedding for low-priority routes.
+
+The limit follows AIMD on time to first byte:
+- while responses start within ``CONCURRENCY_TARGET_LATENCY`` and the limit is
+  in use, it grows by about one per ``limit`` requests;
+- when they start later, it shrinks by ``CONCURRENCY_BACKOFF``, at most once
+  per target latency so a single slow burst doesn't collapse it.
+
+Uploads and exports don't feed the limit: their first byte waits on the
+client's body or on the whole export, so it says nothing about load. They
+still count toward the requests in flight.
+
+Low-priority requests (search, uploads, exports and debug routes) are only
+admitted while fewer than ``limit`` requests are in flight; otherwise they get
+a fast ``503`` with ``Retry-After``. Everything else, card views and auth
+included, is always admitted and counts toward the in-flight total, so under
+saturation it is the low-priority work that backs off.
+"""
+import logging
+import re
+import time
+from typing import List, Optional, Pattern, Tuple
+
+from app.core.config import settings
+from app.core.metrics import counter, gauge
+from app.core.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+CONCURRENCY_INITIAL_LIMIT = getattr(settings, "CONCURRENCY_INITIAL_LIMIT", 20)
+CONCURRENCY_MIN_LIMIT = getattr(settings, "CONCURRENCY_MIN_LIMIT", 4)
+CONCURRENCY_MAX_LIMIT = getattr(settings, "CONCURRENCY_MAX_LIMIT", 200)
+CONCURRENCY_TARGET_LATENCY = getattr(settings, "CONCURRENCY_TARGET_LATENCY", 0.25)
+CONCURRENCY_BACKOFF = getattr(settings, "CONCURRENCY_BACKOFF", 0.9)
+
+concurrency_limit = gauge("concurrency_limit", "Current adaptive concurrency limit")
+requests_in_flight = gauge("requests_in_flight", "HTTP requests being handled", ["priority"])
+requests_shed = counter("requests_shed_total", "Low-priority requests rejected with 503", ["route"])
+
+# (method or None for any, path pattern)
+LOW_PRIORITY_ROUTES: List[Tuple[Optional[str], Pattern]] = [
+    ("GET", re.compile(r"^/v1/users$")),
+    ("GET", re.compile(r"^/v1/skills$")),
+    ("POST", re.compile(r"^/v1/users/batch$")),
+    ("POST", re.compile(r"^/v1/users/me/(avatar|story)$")),
+    ("POST", re.compile(r"^/v1/skills/upload-image$")),
+    ("GET", re.compile(r"^/v1/admin/export$")),
+    (None, re.compile(r"^/debug/")),
+]
+
+# Routes whose time to first byte is bound by the request body or the response
+# size rather than by load; left out of the limit's latency signal
+UNOBSERVED_ROUTES: List[Tuple[Optional[str], Pattern]] = [
+    ("POST", re.compile(r"^/v1/users/me/(avatar|story)$")),
+    ("POST", re.compile(r"^/v1/skills/upload-image$")),
+    ("GET", re.compile(r"^/v1/admin/export$")),
+]
+
+
+class AdaptiveLimit:
+    """AIMD concurrency limit. Used from the event loop only, so no locking."""
+
+    def __init__(self, initial: float = CONCURRENCY_INITIAL_LIMIT, minimum: float = CONCURRENCY_MIN_LIMIT,
+                 maximum: float = CONCURRENCY_MAX_LIMIT, target_latency: float = CONCURRENCY_TARGET_LATENCY,
+                 backoff: float = CONCURRENCY_BACKOFF):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.in_flight = 0
+        self._last_decrease = 0.0
+
+    def saturated(self) -> bool:
+        return self.in_flight >= int(self.limit)
+
+    def observe(self, latency: float, in_flight: int, now: float):
+        """Adjust the limit for a request that started responding after ``latency`` seconds."""
+        if latency > self.target_latency:
+            if now - self._last_decrease >= self.target_latency:
+                self.limit = max(self.minimum, self.limit * self.backoff)
+                self._last_decrease = now
+        elif in_flight >= self.limit / 2:
+            # Only grow a limit that is actually being used
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+
+def _matches(routes: List[Tuple[Optional[str], Pattern]], scope) -> bool:
+    for method, pattern in routes:
+        if (method is None or scope["method"] == method) and pattern.match(scope["path"]):
+            return True
+    return False
+
+
+def is_low_priority(scope) -> bool:
+    return _matches(LOW_PRIORITY_ROUTES, scope)
+
+
+def is_observed(scope) -> bool:
+    """Whether the request's time to first byte feeds the adaptive limit."""
+    return not _matches(UNOBSERVED_ROUTES, scope)
+
+
+class LoadSheddingMiddleware:
+    def __init__(self, app, limit: AdaptiveLimit = None):
+        self.app = app
+        self.limit = limit or AdaptiveLimit()
+        concurrency_limit.set_function(lambda: self.limit.limit)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        low_priority = is_low_priority(scope)
+        if low_priority and self.limit.saturated():
+            await self._shed(scope, send)
+            return
+
+        limit = self.limit
+        priority = "low" if low_priority else "normal"
+        start = time.perf_counter()
+        limit.in_flight += 1
+        requests_in_flight.inc(priority=priority)
+        in_flight = limit.in_flight
+
+        async def send_observed(message):
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                limit.observe(now - start, in_flight, now)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_observed if is_observed(scope) else send)
+        finally:
+            limit.in_flight -= 1
+            requests_in_flight.dec(priority=priority)
+
+    async def _shed(self, scope, send):
+        # Debug paths are open-ended; keep them to one series
+        route = "/debug" if scope["path"].startswith("/debug/") else scope["path"]
+        requests_shed.inc(route=route)
+        body = dumps({"error": "Server is busy, try again shortly"})
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", b"1"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,21 @@
+"""
+Starts the event-loop monitor and attributes loop stalls to the requests in
+flight; in test mode (``LOOP_BLOCK_FAIL_MS`` or ``fail_on_blocking``) fails
+requests that blocked the loop for too long.
+"""
+from app.core.loop_monitor import check_stalls, monitor
+
+
+class LoopMonitorMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        current = monitor() if scope["type"] == "http" else None
+        if current is None:
+            await self.app(scope, receive, send)
+            return
+
+        with current.watch(f"{scope['method']} {scope['path']}") as watch:
+            await self.app(scope, receive, send)
+        check_stalls(watch)
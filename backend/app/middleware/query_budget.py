@@ -0,0 +1,75 @@
+"""
+Request middleware enforcing a soft SQL statement budget.
+
+Every HTTP request is tracked with ``track_queries``. Statement count and DB
+time are exported per route, requests over ``SQL_STATEMENT_BUDGET`` are
+logged, and statement shapes repeated ``SQL_N_PLUS_ONE_THRESHOLD`` times or
+more are logged as N+1 suspects. The totals are also sent back in a
+``Server-Timing`` header.
+"""
+import logging
+
+from app.core.config import settings
+from app.core.metrics import counter, histogram
+from app.db.query_stats import track_queries
+
+logger = logging.getLogger(__name__)
+
+SQL_STATEMENT_BUDGET = getattr(settings, "SQL_STATEMENT_BUDGET", 5)
+SQL_N_PLUS_ONE_THRESHOLD = getattr(settings, "SQL_N_PLUS_ONE_THRESHOLD", 3)
+
+statements_per_request = histogram(
+    "db_statements_per_request",
+    "SQL statements issued per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55),
+)
+db_time_per_request = histogram("db_time_per_request_seconds", "Time spent in SQL per request", ["route"])
+budget_exceeded = counter("db_statement_budget_exceeded_total", "Requests over the statement budget", ["route"])
+n_plus_one_suspects = counter("db_n_plus_one_suspects_total", "Requests with repeated statement shapes", ["route"])
+
+
+def route_label(scope) -> str:
+    # The matched route template, so /v1/users/{user_id} doesn't explode into one series per id
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    timing = f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} statements"'
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                self._report(scope, stats)
+
+    def _report(self, scope, stats):
+        route = route_label(scope)
+        statements_per_request.observe(stats.count, route=route)
+        db_time_per_request.observe(stats.duration, route=route)
+
+        if stats.count > SQL_STATEMENT_BUDGET:
+            budget_exceeded.inc(route=route)
+            logger.warning(
+                f"{scope['method']} {scope['path']} issued {stats.count} SQL statements "
+                f"({stats.duration * 1000:.1f} ms), budget is {SQL_STATEMENT_BUDGET}"
+            )
+
+        suspects = stats.repeated_shapes(SQL_N_PLUS_ONE_THRESHOLD)
+        if suspects:
+            n_plus_one_suspects.inc(route=route)
+            for shape, count in suspects:
+                logger.warning(f"Possible N+1 in {scope['method']} {route}: {count}x {shape[:200]}")
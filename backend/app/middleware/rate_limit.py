@@ -0,0 +1,218 @@
+"""
+Token-bucket rate limiting for expensive endpoints.
+
+Each policy is a bucket of ``burst`` tokens refilled at ``rate`` tokens per
+second; a request takes one token or is answered with ``429`` and a
+``Retry-After`` header. Buckets are per policy and per caller: the
+authenticated user (from a bearer token or Telegram initData, both verified
+through their caches) or, for anonymous requests, the client IP.
+
+Buckets live in process memory by default, so with several workers each one
+enforces the limit on its own. Set ``RATE_LIMIT_REDIS_URL`` to share them
+through Redis (needs the ``redis`` package); if Redis is unreachable requests
+are let through rather than failed.
+
+Policies are configured as ``"<requests>/<second|minute|hour>"`` strings, e.g.
+``RATE_LIMIT_UPLOADS = "10/minute"``; the request count is also the burst.
+"""
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Pattern, Tuple
+
+from jose import JWTError
+
+from app.core.config import settings
+from app.core.metrics import counter
+from app.core.serialization import dumps
+from app.core.telegram_auth import verify_init_data
+from app.middleware.auth_cache import token_claims
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = getattr(settings, "RATE_LIMIT_ENABLED", True)
+RATE_LIMIT_REDIS_URL = getattr(settings, "RATE_LIMIT_REDIS_URL", None)
+RATE_LIMIT_MEMORY_KEYS = getattr(settings, "RATE_LIMIT_MEMORY_KEYS", 100_000)
+# Behind a reverse proxy every request comes from the proxy; use the address it appends instead
+RATE_LIMIT_TRUST_FORWARDED_FOR = getattr(settings, "RATE_LIMIT_TRUST_FORWARDED_FOR", False)
+
+rate_limited = counter("rate_limited_total", "Requests rejected by the rate limiter", ["policy"])
+rate_limit_backend_errors = counter("rate_limit_backend_errors_total", "Rate limiter backend failures")
+
+_UNITS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+@dataclass(frozen=True)
+class RatePolicy:
+    name: str
+    rate: float
+    burst: int
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "RatePolicy":
+        """``"10/minute"`` -> 10 requests of burst, refilled at 10 per minute."""
+        count, _, unit = spec.partition("/")
+        requests = int(count)
+        return cls(name, requests / _UNITS[unit.strip().rstrip("s")], requests)
+
+
+UPLOADS = RatePolicy.parse("uploads", getattr(settings, "RATE_LIMIT_UPLOADS", "10/minute"))
+SEARCH = RatePolicy.parse("search", getattr(settings, "RATE_LIMIT_SEARCH", "60/minute"))
+
+# (method, path pattern, policy); the first match applies
+DEFAULT_RULES: List[Tuple[str, Pattern, RatePolicy]] = [
+    ("POST", re.compile(r"^/v1/users/me/avatar$"), UPLOADS),
+    ("POST", re.compile(r"^/v1/users/me/story$"), UPLOADS),
+    ("POST", re.compile(r"^/v1/skills/upload-image$"), UPLOADS),
+    ("GET", re.compile(r"^/v1/users$"), SEARCH),
+    ("GET", re.compile(r"^/v1/skills$"), SEARCH),
+    ("POST", re.compile(r"^/v1/users/batch$"), SEARCH),
+]
+
+
+class MemoryBackend:
+    """Buckets in a bounded LRU dict. Only touched from the event loop, so no lock."""
+
+    def __init__(self, maxsize: int = RATE_LIMIT_MEMORY_KEYS):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def acquire(self, key: str, policy: RatePolicy, now: float) -> Tuple[bool, float]:
+        """Take a token; returns ``(allowed, seconds until one is available)``."""
+        tokens, updated = self._buckets.get(key, (policy.burst, now))
+        tokens = min(policy.burst, tokens + max(0.0, now - updated) * policy.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / policy.rate
+
+
+_REDIS_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend:
+    """Buckets shared by every worker, updated atomically by a Lua script."""
+
+    def __init__(self, url: str, prefix: str = "ratelimit"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_REDIS_URL is set but the redis package is not installed") from e
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def acquire(self, key: str, policy: RatePolicy, now: float) -> Tuple[bool, float]:
+        allowed, tokens = await self._script(
+            keys=[f"{self.prefix}:{key}"], args=[policy.rate, policy.burst, now]
+        )
+        if allowed:
+            return True, 0.0
+        return False, (1 - float(tokens)) / policy.rate
+
+
+def default_backend():
+    if RATE_LIMIT_REDIS_URL:
+        return RedisBackend(RATE_LIMIT_REDIS_URL)
+    return MemoryBackend()
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def client_key(scope) -> str:
+    """``user:<id>`` for authenticated callers, ``ip:<address>`` otherwise."""
+    authorization = _header(scope, b"authorization")
+    if authorization and authorization.startswith("Bearer "):
+        try:
+            subject = token_claims(authorization[7:], settings.SECRET_KEY, settings.ALGORITHM).get("sub")
+            if subject:
+                return f"user:{subject}"
+        except JWTError:
+            pass
+
+    init_data = _header(scope, b"x-telegram-init-data")
+    if init_data:
+        is_valid, _, _, user_info = verify_init_data(init_data)
+        if is_valid and user_info.get("telegram_id"):
+            return f"user:{user_info['telegram_id']}"
+
+    if RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded_for = _header(scope, b"x-forwarded-for")
+        if forwarded_for:
+            return f"ip:{forwarded_for.split(',')[-1].strip()}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, rules=None, backend=None):
+        self.app = app
+        self.rules = DEFAULT_RULES if rules is None else rules
+        self.backend = backend or default_backend()
+
+    def policy_for(self, scope) -> Optional[RatePolicy]:
+        for method, pattern, policy in self.rules:
+            if scope["method"] == method and pattern.match(scope["path"]):
+                return policy
+        return None
+
+    async def __call__(self, scope, receive, send):
+        policy = self.policy_for(scope) if scope["type"] == "http" and RATE_LIMIT_ENABLED else None
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{policy.name}:{client_key(scope)}"
+        try:
+            allowed, retry_after = await self.backend.acquire(key, policy, time.time())
+        except Exception as e:
+            # Losing the limiter shouldn't take the endpoints down with it
+            rate_limit_backend_errors.inc()
+            logger.warning(f"Rate limiter backend failed, letting the request through: {e}")
+            allowed, retry_after = True, 0.0
+
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        rate_limited.inc(policy=policy.name)
+        body = dumps({"error": "Too many requests", "retry_after": math.ceil(retry_after)})
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(retry_after)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,91 +1,148 @@
 import logging
+import time
 from typing import Optional
 
 from fastapi import Request, Depends
 from fastapi.exceptions import HTTPException
-from jose import JWTError, jwt
+from jose import JWTError
 from starlette.status import HTTP_401_UNAUTHORIZED
 
 from app.core.telegram_auth import (
-    validate_telegram_data,
-    extract_user_info,
+    verify_init_data,
     parse_init_data_from_url,
 )
-from app.db.session import get_db_session
-from app.db.models import User
+from app.core.serialization import JSONResponse, read_json
+from app.db.session import set_routing_user
 from app.core.config import settings
+from app.core.metrics import histogram
+from app.db.functions import get_entitlements
+from app.middleware.auth_cache import UserStatus, token_claims, user_status
 
 logger = logging.getLogger(__name__)
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 
+auth_seconds = histogram(
+    "auth_seconds",
+    "Time spent resolving the caller in get_auth_context",
+    ["method"],
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
 class AuthContext:
     current_user_id: Optional[int] = None
     telegram_data: Optional[dict] = None
     telegram_user: Optional[dict] = None
     telegram_auth_error: Optional[str] = None
+    is_banned: bool = False
+    # From the token's entitlement claims when they are current; see premium_tier()
+    premium_tier: Optional[int] = None
+
+
+def _trusted_tier(claims: dict, status: UserStatus) -> Optional[int]:
+    """The token's tier claim, or None if the tier changed or expired since it was issued."""
+    if "tier" not in claims or claims.get("ev") != status.entitlement_version:
+        return None
+    tier_expires_at = claims.get("tier_exp")
+    if tier_expires_at is not None and tier_expires_at <= time.time():
+        return None
+    return claims["tier"]
+
+
+def _authenticate(context: AuthContext, user_id, method: str, claims: Optional[dict] = None) -> bool:
+    """Accept ``user_id`` if it exists and isn't banned. Served from the auth cache when possible."""
+    status = user_status(user_id)
+    if not status.exists:
+        logger.debug(f"{method} user {user_id} not found in DB")
+        return False
+    if status.is_banned:
+        logger.info(f"Rejected banned user {user_id}")
+        context.is_banned = True
+        return False
+
+    context.current_user_id = int(user_id)
+    if claims is not None:
+        context.premium_tier = _trusted_tier(claims, status)
+    set_routing_user(user_id)
+    logger.debug(f"Authenticated via {method}: {user_id}")
+    return True
+
 
 async def get_auth_context(request: Request) -> AuthContext:
+    start = time.perf_counter()
     context = AuthContext()
+    method = await _resolve_auth(request, context)
+    auth_seconds.observe(time.perf_counter() - start, method=method)
+    return context
+
+
+async def _resolve_auth(request: Request, context: AuthContext) -> str:
+    """Fill ``context`` from the request; returns the method used, for metrics."""
     auth_header = request.headers.get("Authorization")
 
     if auth_header and auth_header.startswith("Bearer "):
         try:
             token = auth_header.split("Bearer ")[1]
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            user_id = payload.get("sub")
+            claims = token_claims(token, SECRET_KEY, ALGORITHM)
+            user_id = claims.get("sub")
             if not user_id:
                 raise HTTPException(status_code=401, detail="Invalid JWT: no subject")
 
-            with get_db_session() as session:
-                user = session.query(User).get(user_id)
-                if user:
-                    context.current_user_id = user.id
-                    logger.debug(f"Authenticated via JWT: {user_id}")
-                    return context
-                else:
-                    logger.warning(f"JWT valid, but user {user_id} not found")
+            if _authenticate(context, user_id, "JWT", claims) or context.is_banned:
+                return "jwt"
+            logger.warning(f"JWT valid, but user {user_id} not found")
         except JWTError as e:
             logger.debug(f"JWT decode failed: {str(e)}")
 
     init_data = (
         request.headers.get("X-Telegram-Init-Data")
         or parse_init_data_from_url(str(request.url))
-        or (await request.json()).get("initData") if request.headers.get("content-type", "").startswith("application/json") else None
     )
+    if not init_data and request.headers.get("content-type", "").startswith("application/json"):
+        # Parsed once and cached, so the endpoint reading the same body doesn't parse it again
+        body = await read_json(request)
+        init_data = body.get("initData") if isinstance(body, dict) else None
 
     if not init_data:
-        return context
+        return "none"
 
     logger.debug(f"Processing Telegram init data from: {request.url.path}")
 
-    is_valid, data_dict, error_message = validate_telegram_data(init_data)
+    is_valid, data_dict, error_message, user_info = verify_init_data(init_data)
     if not is_valid:
         context.telegram_auth_error = error_message
         logger.warning(f"Invalid Telegram data: {error_message}")
-        return context
+        return "telegram"
 
-    user_info = extract_user_info(data_dict)
     context.telegram_data = data_dict
     context.telegram_user = user_info
 
     telegram_id = user_info.get("telegram_id")
     if telegram_id:
-        with get_db_session() as session:
-            user = session.query(User).filter_by(id=telegram_id).first()
-            if user:
-                context.current_user_id = user.id
-                logger.debug(f"User authenticated via Telegram: {telegram_id}")
-            else:
-                logger.debug(f"Telegram user {telegram_id} not found in DB")
+        _authenticate(context, telegram_id, "Telegram")
+
+    return "telegram"
 
-    return context
+
+def premium_tier(context: AuthContext) -> int:
+    """
+    The authenticated caller's premium tier: a claim read when their token's
+    entitlement claims are current, otherwise a database read.
+    """
+    if context.premium_tier is None:
+        entitlements = get_entitlements(context.current_user_id)
+        context.premium_tier = (entitlements or {}).get("premium_tier") or 0
+    return context.premium_tier
 
 
 def check_context(context: AuthContext):
     if context.telegram_auth_error:
         return None, HTTPException(status_code=401, detail=context.telegram_auth_error)
+
+    if context.is_banned:
+        # Handlers return this error as their response, so it has to be a real one
+        return None, JSONResponse(status_code=403, content={"error": "User is banned"})
     
     if not context.current_user_id:
         return None, HTTPException(status_code=401, detail="User not found")
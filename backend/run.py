@@ -8,12 +8,14 @@ logger = logging.getLogger(__name__)
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app.bot import bot
-
 def run_bot():
     bot.infinity_polling()
 
 if __name__ == "__main__":
+    # Imported here since spawned image pool workers re-run this module as
+    # __mp_main__, and they mustn't load the bot and the app with it
+    from app.bot import bot
+
     thread = threading.Thread(target=run_bot, daemon=True)
     thread.start()
 
@@ -0,0 +1,59 @@
+"""
+Test setup: the app runs against a throwaway SQLite database.
+
+Settings come from the environment. When ``app/core/config.py`` isn't present
+(it holds deployment secrets and isn't checked in), ``fallback_config`` builds
+a minimal settings module from the same variables.
+"""
+import os
+import tempfile
+import time
+
+import pytest
+
+from fallback_config import install as install_fallback_config
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir.name, 'test.db')}"
+os.environ.setdefault("SECRET_KEY", "test-secret-key-" + "x" * 32)
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:test-token")
+
+install_fallback_config()
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app, prepare_database  # noqa: E402
+from app.api.auth import create_access_token  # noqa: E402
+from app.db.functions import sign_in_user  # noqa: E402
+from app.middleware import auth_cache  # noqa: E402
+
+# The clients below aren't entered, so the app's startup doesn't run
+prepare_database()
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def _clear_auth_cache():
+    auth_cache.clear()
+    yield
+    auth_cache.clear()
+
+
+_next_user_id = int(time.time())
+
+
+@pytest.fixture
+def make_user():
+    """Create a user; returns ``(user_id, Authorization headers)``."""
+    def make(**fields):
+        global _next_user_id
+        _next_user_id += 1
+        user_id = _next_user_id
+        sign_in_user(user_id, username=f"user{user_id}", name=f"User {user_id}", **fields)
+        return user_id, {"Authorization": f"Bearer {create_access_token(str(user_id))}"}
+    return make
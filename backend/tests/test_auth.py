@@ -0,0 +1,16 @@
+def test_banned_user_gets_403(client, make_user):
+    user_id, headers = make_user(is_banned=True)
+
+    response = client.get("/v1/users/me", headers=headers)
+
+    assert response.status_code == 403
+    assert response.json() == {"error": "User is banned"}
+
+
+def test_active_user_gets_their_card(client, make_user):
+    user_id, headers = make_user()
+
+    response = client.get("/v1/users/me", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["id"] == user_id
@@ -0,0 +1,49 @@
+import asyncio
+import io
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from PIL import Image
+
+from app.api import users
+from app.core import images
+from fallback_config import install as install_fallback_config
+
+
+def _png(size=(1024, 768)) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", size, "orange").save(output, format="PNG")
+    return output.getvalue()
+
+
+@pytest.fixture
+def image_pool(monkeypatch):
+    # Spawned workers import app.core.images afresh, so they need the settings too
+    pool = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=install_fallback_config)
+    monkeypatch.setattr(images, "_executor", pool)
+    yield pool
+    pool.shutdown()
+
+
+def test_compress_resizes_in_the_pool(image_pool):
+    output = asyncio.run(images.compress(_png(), max_size=(512, 512)))
+
+    image = Image.open(io.BytesIO(output))
+    assert image.format == "JPEG"
+    assert image.size == (512, 384)
+
+
+def test_avatar_upload_answers_503_when_the_image_queue_is_full(client, make_user, monkeypatch, tmp_path):
+    user_id, headers = make_user()
+    monkeypatch.setattr(users, "images_path", str(tmp_path))
+    monkeypatch.setattr(images, "_slots", threading.BoundedSemaphore(1))
+    images._slots.acquire()
+
+    response = client.post("/v1/users/me/avatar", headers=headers, files={"file": ("avatar.png", _png(), "image/png")})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,31 @@
+import asyncio
+
+from app.middleware.load_shedding import AdaptiveLimit, LoadSheddingMiddleware
+
+
+def _request(method, path):
+    limit = AdaptiveLimit(initial=20, target_latency=0.01)
+
+    async def slow_app(scope, receive, send):
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    middleware = LoadSheddingMiddleware(slow_app, limit)
+    asyncio.run(middleware({"type": "http", "method": method, "path": path}, receive, send))
+    return limit
+
+
+def test_a_slow_search_shrinks_the_limit():
+    assert _request("GET", "/v1/users").limit < 20
+
+
+def test_a_slow_upload_leaves_the_limit_alone():
+    assert _request("POST", "/v1/users/me/avatar").limit == 20
+    assert _request("GET", "/v1/admin/export").limit == 20
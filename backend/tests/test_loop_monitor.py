@@ -0,0 +1,33 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.loop_monitor import EventLoopBlocked, fail_on_blocking
+from app.middleware.loop_monitor import LoopMonitorMiddleware
+
+app = FastAPI()
+app.add_middleware(LoopMonitorMiddleware)
+
+
+@app.get("/blocking")
+async def blocking():
+    time.sleep(0.4)
+    return {}
+
+
+@app.get("/threadpool")
+def threadpool():
+    time.sleep(0.4)
+    return {}
+
+
+def test_a_route_blocking_the_loop_fails_in_test_mode():
+    with fail_on_blocking(100), pytest.raises(EventLoopBlocked, match="GET /blocking"):
+        TestClient(app).get("/blocking")
+
+
+def test_a_sync_route_runs_off_the_loop():
+    with fail_on_blocking(100):
+        assert TestClient(app).get("/threadpool").status_code == 200
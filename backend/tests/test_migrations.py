@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+
+from app.db import migrations
+from app.db.migrations import RevisionPending, applied_revisions, upgrade
+
+
+def test_a_pending_revision_is_retried_on_the_next_upgrade(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    extension_installed = False
+
+    def needs_extension(engine):
+        if not extension_installed:
+            raise RevisionPending("extension missing")
+
+    monkeypatch.setattr(migrations, "load_revisions", lambda: [
+        SimpleNamespace(revision="0001", description="first", upgrade=lambda engine: None),
+        SimpleNamespace(revision="0002", description="needs an extension", upgrade=needs_extension),
+        SimpleNamespace(revision="0003", description="third", upgrade=lambda engine: None),
+    ])
+
+    assert upgrade(engine) == ["0001", "0003"]
+    assert sorted(applied_revisions(engine)) == ["0001", "0003"]
+
+    extension_installed = True
+    assert upgrade(engine) == ["0002"]
+    assert sorted(applied_revisions(engine)) == ["0001", "0002", "0003"]
@@ -0,0 +1,29 @@
+"""Statements per request on the card routes, pinned so an N+1 or a lost cache shows up as a failure."""
+from app.db.query_stats import assert_query_count
+
+# The user row plus one query per relation: contacts, projects, skills, custom links
+CARD_QUERIES = 5
+
+
+def test_own_card(client, make_user):
+    user_id, headers = make_user()
+
+    # The first request also looks the caller up for the auth cache
+    with assert_query_count(1 + CARD_QUERIES):
+        assert client.get("/v1/users/me", headers=headers).status_code == 200
+    with assert_query_count(CARD_QUERIES):
+        assert client.get("/v1/users/me", headers=headers).status_code == 200
+
+
+def test_batch_cost_does_not_grow_with_ids(client, make_user):
+    user_id, headers = make_user()
+    ids = [make_user()[0] for _ in range(5)]
+    client.get("/v1/users/me", headers=headers)
+
+    with assert_query_count(CARD_QUERIES):
+        response = client.post("/v1/users/batch", headers=headers, json={"ids": ids[:1]})
+    assert len(response.json()["users"]) == 1
+
+    with assert_query_count(CARD_QUERIES):
+        response = client.post("/v1/users/batch", headers=headers, json={"ids": ids})
+    assert len(response.json()["users"]) == 5
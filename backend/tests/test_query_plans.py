@@ -0,0 +1,45 @@
+"""
+Index use of the hot queries (see ``app.db.query_plans``).
+
+Needs PostgreSQL, where the checks are meaningful: set ``TEST_POSTGRES_URL``
+to a database the tests may seed. Skipped otherwise.
+"""
+import os
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.db.query_plans import CHECKS, check_plans, sample_values
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(
+    not POSTGRES_URL or not POSTGRES_URL.startswith("postgresql"),
+    reason="query plan checks need TEST_POSTGRES_URL pointing at PostgreSQL",
+)
+
+
+@pytest.fixture(scope="module")
+def plans():
+    from app.benchmarks.dataset import seed_database
+    from app.db.migrations import upgrade
+
+    engine = create_engine(POSTGRES_URL)
+    try:
+        with engine.connect() as conn:
+            try:
+                sample_values(conn)
+            except Exception:
+                seed_database(POSTGRES_URL, 5000)
+        upgrade(engine)
+        with engine.connect() as conn:
+            results = check_plans(conn)
+    finally:
+        engine.dispose()
+    return {result.check.name: result for result in results}
+
+
+@pytest.mark.parametrize("name", [check.name for check in CHECKS])
+def test_query_uses_an_index(plans, name):
+    result = plans[name]
+    assert result.ok, f"{name} scans {'; '.join(result.scans)}:\n" + "\n".join(result.plan)
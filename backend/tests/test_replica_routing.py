@@ -0,0 +1,52 @@
+"""Read routing between the primary and a replica, with two SQLite databases standing in for them."""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import session as db_session
+from app.db.functions import get_user
+from app.db.models import Base, User
+
+
+@pytest.fixture
+def replica(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(db_session, "ReplicaSessionFactory", sessionmaker(bind=engine))
+    db_session._recent_writers.clear()
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _forget_this_context_wrote():
+    # Writes also pin the writing context to the primary; tests of per-user
+    # pinning start from a context that hasn't written
+    db_session._primary_pinned_until.set(0.0)
+
+
+def test_reads_go_to_the_replica(replica, make_user):
+    user_id, _ = make_user()
+    with replica() as session, session.begin():
+        session.add(User(id=user_id, username="stale", name="On the replica"))
+    db_session._recent_writers.clear()
+    _forget_this_context_wrote()
+
+    assert get_user(user_id)["name"] == "On the replica"
+
+
+def test_recent_writer_reads_from_the_primary(replica, make_user):
+    user_id, _ = make_user()
+    _forget_this_context_wrote()
+
+    # Not replicated yet, but the user who just wrote still sees their row
+    assert get_user(user_id)["name"] == f"User {user_id}"
+
+
+def test_new_user_sees_their_card_before_replication(replica, client, make_user):
+    user_id, headers = make_user()
+    _forget_this_context_wrote()
+
+    response = client.get("/v1/users/me", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["id"] == user_id
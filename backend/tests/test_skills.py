@@ -0,0 +1,23 @@
+def test_creating_a_skill_changes_the_etag(client, make_user):
+    user_id, headers = make_user(premium_tier=1)
+    etag = client.get("/v1/users/me", headers=headers).headers["etag"]
+
+    response = client.post("/v1/skills", headers=headers, json={"name": f"Skill {user_id}"})
+    assert response.status_code == 201
+
+    response = client.get("/v1/users/me", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [skill["name"] for skill in response.json()["skills"]] == [f"Skill {user_id}"]
+
+
+def test_delta_sync_sends_a_created_skill(client, make_user):
+    user_id, headers = make_user(premium_tier=1)
+    version = client.get("/v1/users/me", headers=headers).headers["x-profile-version"]
+
+    client.post("/v1/skills", headers=headers, json={"name": f"Delta skill {user_id}"})
+
+    response = client.get(f"/v1/users/me?since={version}", headers=headers)
+    assert response.status_code == 200
+    assert int(response.json()["version"]) > int(version)
+    assert [skill["name"] for skill in response.json()["skills"]] == [f"Delta skill {user_id}"]
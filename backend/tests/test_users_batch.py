@@ -0,0 +1,18 @@
+def test_batch_returns_cards_and_missing_ids(client, make_user):
+    user_id, headers = make_user()
+    other_id, _ = make_user()
+
+    response = client.post("/v1/users/batch", headers=headers, json={"ids": [other_id, 1]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert list(body["users"]) == [str(other_id)]
+    assert body["missing"] == [1]
+
+
+def test_batch_rejects_a_body_that_is_not_json(client, make_user):
+    user_id, headers = make_user()
+
+    response = client.post("/v1/users/batch", headers=headers, content=b"notjson")
+
+    assert response.status_code == 400
@@ -34,7 +34,8 @@ import {
   User, 
   PremiumStatus, 
   getPremiumStatus,
-  generatePaymentLink
+  generatePaymentLink,
+  refreshToken
 } from "@/lib/api";
 
 const PREMIUM_TIER = {
@@ -143,6 +144,8 @@ export function PremiumFeatures({ user, onSubscribed }: PremiumFeaturesProps) {
                   const verified = await checkPaymentStatus(user.id);
                   
                   if (verified) {
+                    // The stored token still carries the old tier
+                    await refreshToken();
                     await loadPremiumData();
                     toast({ 
                       title: "Payment Successful", 
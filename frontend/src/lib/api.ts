@@ -242,6 +242,14 @@ export async function validateUser(): Promise<ApiResponse<User>> {
   }
 }
 
+export async function refreshToken(): Promise<ApiResponse<null>> {
+  const response = await apiRequest<null>('/v1/auth/refresh', { method: 'POST' });
+  if (response.success && response.token) {
+    localStorage.setItem('authToken', response.token);
+  }
+  return response;
+}
+
 export async function uploadAvatar(file: File): Promise<ApiResponse<{ avatar_url: string }>> {
   const formData = new FormData();
   formData.append('file', file);